@@ -0,0 +1,59 @@
+import hashlib
+
+from django.utils.cache import (get_conditional_response, patch_cache_control,
+                                patch_vary_headers)
+from django.utils.http import http_date
+
+from api.serializers import get_subscribed_ids
+
+
+def make_etag(*parts):
+    """Сильный ETag по значениям, от которых зависит ответ."""
+
+    digest = hashlib.sha256(repr(parts).encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def recipe_list_etag(request, recipes, envelope):
+    """ETag списка по отданной странице: адрес с сайтом (ссылки
+    на картинки абсолютные), id и время изменения рецептов страницы,
+    флаги избранного, списка покупок и подписки пользователя,
+    а также поля пагинации без результатов (count, next, previous).
+    Считается по уже выбранной странице, без запросов ко всей
+    отфильтрованной выборке."""
+
+    subscribed_ids = get_subscribed_ids(request)
+    return make_etag(
+        request.build_absolute_uri(),
+        [
+            (
+                recipe.pk,
+                recipe.updated_at.isoformat(),
+                recipe.is_favorited,
+                recipe.is_in_shopping_cart,
+                recipe.author_id in subscribed_ids,
+            )
+            for recipe in recipes
+        ],
+        envelope,
+    )
+
+
+def conditional_response(request, etag, render, last_modified=None):
+    """304 без вызова render, если клиент прислал актуальный валидатор.
+    Ответ зависит от пользователя, поэтому в Vary - Authorization."""
+
+    timestamp = last_modified and int(last_modified.timestamp())
+    response = get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=timestamp,
+    )
+    if response is None:
+        response = render()
+    response["ETag"] = etag
+    if timestamp:
+        response["Last-Modified"] = http_date(timestamp)
+    patch_vary_headers(response, ("Authorization",))
+    patch_cache_control(response, no_cache=True)
+    return response
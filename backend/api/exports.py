@@ -0,0 +1,191 @@
+import csv
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from datetime import date
+
+from django.conf import settings
+
+from api.pdf import text_pdf
+from food.models import ShoppingCartIngredient
+
+EXPORT_CHUNK_SIZE = 500
+# Списки длиннее этого числа строк генерируются фоновой задачей.
+EXPORT_BACKGROUND_THRESHOLD = 300
+
+
+class Echo:
+    """Псевдо-файл для csv.writer: write возвращает строку,
+    а не пишет её, чтобы строки можно было отдавать генератором."""
+
+    def write(self, value):
+        return value
+
+
+def shopping_cart_ingredients(user):
+    """Сумма каждого ингредиента по всем рецептам в списке покупок.
+    Суммы берутся из ShoppingCartIngredient, строки читаются порциями."""
+
+    return (
+        ShoppingCartIngredient.objects.filter(user=user)
+        .order_by("ingredient__name")
+        .values_list(
+            "ingredient__name",
+            "ingredient__measurement_unit",
+            "amount",
+        )
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+
+
+def text_lines(ingredients):
+    yield f"Список продуктов на {date.today()}:"
+    yield " "
+    for name, unit, amount in ingredients:
+        yield f"{name}: {amount} {unit}"
+
+
+def render_txt(ingredients):
+    for line in text_lines(ingredients):
+        yield line + "\n"
+
+
+def render_csv(ingredients):
+    writer = csv.writer(Echo())
+    yield writer.writerow(("name", "measurement_unit", "amount"))
+    for row in ingredients:
+        yield writer.writerow(row)
+
+
+def render_json(ingredients):
+    yield "["
+    separator = ""
+    for name, unit, amount in ingredients:
+        item = {"name": name, "measurement_unit": unit, "amount": amount}
+        yield separator + json.dumps(item, ensure_ascii=False)
+        separator = ","
+    yield "]"
+
+
+def render_pdf(ingredients):
+    """Текстовый PDF шрифтом settings.SHOPPING_LIST_FONT."""
+
+    return text_pdf(text_lines(ingredients), settings.SHOPPING_LIST_FONT)
+
+
+EXPORT_FORMATS = {
+    "txt": ("text/plain", render_txt),
+    "csv": ("text/csv", render_csv),
+    "json": ("application/json", render_json),
+    "pdf": ("application/pdf", render_pdf),
+}
+
+
+class ExportDigest:
+    """Хеш содержимого списка покупок, формата и даты в заголовке.
+    Считается по мере чтения строк через rows(), вместе с их числом,
+    поэтому список не собирается в памяти."""
+
+    def __init__(self, file_format):
+        self.hash = hashlib.sha256(f"{file_format}\x1e{date.today()}".encode())
+        self.count = 0
+
+    def rows(self, ingredients):
+        for row in ingredients:
+            self.hash.update(
+                ("\x1e" + "\x1f".join(map(str, row))).encode()
+            )
+            self.count += 1
+            yield row
+
+    @property
+    def key(self):
+        return self.hash.hexdigest()
+
+
+def export_digest(ingredients, file_format):
+    """ExportDigest всех строк ingredients."""
+
+    digest = ExportDigest(file_format)
+    for _ in digest.rows(ingredients):
+        pass
+    return digest
+
+
+class ExportCache:
+    """Кеш сгенерированных файлов на диске.
+    Имя файла - хеш содержимого, время изменения файла обновляется
+    при каждом обращении; когда суммарный размер превышает max_size,
+    удаляются давно не запрашивавшиеся файлы (LRU)."""
+
+    def __init__(self, directory, max_size):
+        self.directory = directory
+        self.max_size = max_size
+        self.lock = threading.Lock()
+
+    def path(self, key):
+        return os.path.join(self.directory, key)
+
+    def get(self, key):
+        """Открытый файл из кеша или None."""
+
+        path = self.path(key)
+        try:
+            file = open(path, "rb")
+        except FileNotFoundError:
+            return None
+        os.utime(path)
+        return file
+
+    def put(self, chunks, key):
+        """Записывает части файла во временный файл и атомарно
+        переименовывает его в файл кеша с именем key(). Ключ
+        вычисляется после записи, по тем же данным, что и файл.
+        Возвращает ключ и открытый файл, чтобы его не потерять
+        при вытеснении."""
+
+        os.makedirs(self.directory, exist_ok=True)
+        descriptor, temp_path = tempfile.mkstemp(
+            dir=self.directory,
+            suffix=".tmp",
+        )
+        try:
+            with os.fdopen(descriptor, "wb") as file:
+                for chunk in chunks:
+                    if isinstance(chunk, str):
+                        chunk = chunk.encode()
+                    file.write(chunk)
+            key = key()
+            os.replace(temp_path, self.path(key))
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        file = open(self.path(key), "rb")
+        self.evict()
+        return key, file
+
+    def evict(self):
+        with self.lock:
+            entries = []
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith(".tmp"):
+                    continue
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_size:
+                    break
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+
+
+export_cache = ExportCache(
+    settings.SHOPPING_LIST_CACHE_DIR,
+    settings.SHOPPING_LIST_CACHE_MAX_SIZE,
+)
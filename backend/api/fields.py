@@ -1,15 +1,147 @@
 import base64
+import binascii
+from io import BytesIO
 
-from django.core.files.base import ContentFile
-from rest_framework.serializers import ImageField
+from django.conf import settings
+from django.core.files.uploadedfile import (InMemoryUploadedFile,
+                                            TemporaryUploadedFile)
+from PIL import Image
+from rest_framework.serializers import (ImageField, PrimaryKeyRelatedField,
+                                        ReadOnlyField)
+
+from food.cache import tag_cache
+from food.constants import BASE64_CHUNK_SIZE, IMAGE_MAX_PIXELS, IMAGE_MAX_SIZE
+from food.images import rendition_url
+
+BASE64_MARKER = ";base64,"
+# Заголовок data URI длиннее этого не бывает.
+DATA_URI_HEADER_MAX_LENGTH = 256
+# Кодировщики base64 (например, MIME) переносят строки через 76 символов.
+BASE64_WHITESPACE = " \t\r\n"
+STRIP_WHITESPACE = str.maketrans("", "", BASE64_WHITESPACE)
+
+
+def decoded_size(data, start):
+    """Размер данных base64 из data[start:] без их декодирования.
+    Пробельные символы не считаются."""
+
+    end = len(data)
+    while end > start and data[end - 1] in BASE64_WHITESPACE:
+        end -= 1
+    length = end - start - sum(
+        data.count(char, start, end) for char in BASE64_WHITESPACE
+    )
+    tail = data[max(start, end - 2):end]
+    padding = 2 if tail == "==" else 1 if tail.endswith("=") else 0
+    return length // 4 * 3 - padding
+
+
+def decode_base64(data, start, file):
+    """Декодирует data[start:] в file порциями по BASE64_CHUNK_SIZE,
+    не создавая копий всей строки. Пробельные символы пропускаются,
+    неполная четвёрка символов переносится в следующую порцию."""
+
+    rest = ""
+    for offset in range(start, len(data), BASE64_CHUNK_SIZE):
+        chunk = rest + data[offset:offset + BASE64_CHUNK_SIZE].translate(
+            STRIP_WHITESPACE,
+        )
+        end = len(chunk) - len(chunk) % 4
+        file.write(base64.b64decode(chunk[:end], validate=True))
+        rest = chunk[end:]
+    if rest:
+        raise binascii.Error("Incorrect padding")
+    file.seek(0)
 
 
 class Base64ImageField(ImageField):
-    """Кодирует картинку в строку base64."""
+    """Кодирует картинку в строку base64.
+    Строка декодируется порциями: небольшие картинки - в память,
+    большие - во временный файл на диске, как обычные загрузки Django.
+    Размер проверяется до декодирования, число пикселей - по заголовку
+    картинки, до распаковки."""
+
+    default_error_messages = {
+        "invalid_base64": "Некорректная картинка в base64.",
+        "too_large": "Размер картинки больше {max_size} байт.",
+        "too_many_pixels": "В картинке больше {max_pixels} пикселей.",
+    }
 
     def to_internal_value(self, data):
         if isinstance(data, str) and data.startswith("data:image"):
-            forma1t, imgstr = data.split(";base64,")
-            ext = forma1t.split("/")[-1]
-            data = ContentFile(base64.b64decode(imgstr), name="temp." + ext)
+            data = self.decode(data)
         return super().to_internal_value(data)
+
+    def decode(self, data):
+        marker = data.find(BASE64_MARKER, 0, DATA_URI_HEADER_MAX_LENGTH)
+        if marker == -1:
+            self.fail("invalid_base64")
+        content_type = data[len("data:"):marker]
+        name = "temp." + content_type.split("/")[-1]
+        start = marker + len(BASE64_MARKER)
+        size = decoded_size(data, start)
+        if size > IMAGE_MAX_SIZE:
+            self.fail("too_large", max_size=IMAGE_MAX_SIZE)
+        if size > settings.FILE_UPLOAD_MAX_MEMORY_SIZE:
+            file = TemporaryUploadedFile(name, content_type, size, None)
+        else:
+            file = InMemoryUploadedFile(
+                BytesIO(), None, name, content_type, size, None,
+            )
+        try:
+            decode_base64(data, start, file)
+        except binascii.Error:
+            file.close()
+            self.fail("invalid_base64")
+        self.check_pixels(file)
+        return file
+
+    def check_pixels(self, file):
+        """Image.open читает только заголовок, пиксели не распаковываются.
+        Нераспознанную картинку отклонит проверка ImageField."""
+
+        try:
+            with Image.open(file) as image:
+                too_large = image.width * image.height > IMAGE_MAX_PIXELS
+        except Image.DecompressionBombError:
+            too_large = True
+        except Exception:
+            too_large = False
+        finally:
+            file.seek(0)
+        if too_large:
+            file.close()
+            self.fail("too_many_pixels", max_pixels=IMAGE_MAX_PIXELS)
+
+
+class CachedTagField(PrimaryKeyRelatedField):
+    """Тег по id из кеша тегов, без запроса к базе на каждый тег."""
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        try:
+            tag = tag_cache.get(int(data))
+        except (TypeError, ValueError):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        if tag is None:
+            self.fail("does_not_exist", pk_value=data)
+        return tag
+
+
+class ImageRenditionField(ReadOnlyField):
+    """Абсолютный адрес уменьшенной копии картинки."""
+
+    def __init__(self, rendition, **kwargs):
+        self.rendition = rendition
+        kwargs.setdefault("source", "image")
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        url = rendition_url(value, self.rendition)
+        request = self.context.get("request")
+        if request is None:
+            return url
+        return request.build_absolute_uri(url)
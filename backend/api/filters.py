@@ -1,20 +1,27 @@
 import django_filters
 from django.contrib.auth import get_user_model
-from django.db.models import Q
 from django_filters import FilterSet, filters
 
-from food.models import Ingredient, Recipe, Tag
+from food.cache import tag_cache
+from food.models import Ingredient, Recipe
+from food.search import search_ingredients, search_recipes
 
 User = get_user_model()
 
 
+def tag_slug_choices():
+    """Слаги тегов из кеша тегов."""
+
+    return tag_cache.slug_choices()
+
+
 class RecipeFilter(FilterSet):
-    """Фильтрация по полям is_favorited, is_in_shopping_cart, author, tags."""
+    """Фильтрация по полям is_favorited, is_in_shopping_cart, author, tags.
+    Полнотекстовый поиск по названию и описанию - параметр search."""
 
-    tags = filters.ModelMultipleChoiceFilter(
+    tags = filters.MultipleChoiceFilter(
         field_name="tags__slug",
-        to_field_name="slug",
-        queryset=Tag.objects.all(),
+        choices=tag_slug_choices,
     )
     is_in_shopping_cart = filters.NumberFilter(
         method="filter_is_in_shopping_cart",
@@ -22,6 +29,9 @@ class RecipeFilter(FilterSet):
     is_favorited = filters.NumberFilter(
         method="filter_is_favorited",
     )
+    search = filters.CharFilter(
+        method="filter_search",
+    )
 
     class Meta:
         model = Recipe
@@ -30,18 +40,32 @@ class RecipeFilter(FilterSet):
             "tags",
             "is_favorited",
             "is_in_shopping_cart",
+            "search",
         )
 
     def filter_is_in_shopping_cart(self, queryset, name, value):
         if self.request.user.is_authenticated and value:
-            return queryset.filter(shopping_list__user=self.request.user)
+            return self.with_user_flags(queryset).filter(
+                is_in_shopping_cart=True
+            )
         return queryset
 
     def filter_is_favorited(self, queryset, name, value):
         if self.request.user.is_authenticated and value:
-            return queryset.filter(favorite__user=self.request.user)
+            return self.with_user_flags(queryset).filter(is_favorited=True)
         return queryset
 
+    def filter_search(self, queryset, name, value):
+        return search_recipes(queryset, value)
+
+    def with_user_flags(self, queryset):
+        """Флаги берутся из аннотаций queryset вьюсета,
+        если их там ещё нет - добавляются здесь."""
+
+        if "is_favorited" in queryset.query.annotations:
+            return queryset
+        return queryset.with_user_flags(self.request.user)
+
 
 class IngredientFilter(django_filters.FilterSet):
     """Ищите ингредиенты по полю name регистронезависимо:
@@ -56,6 +80,4 @@ class IngredientFilter(django_filters.FilterSet):
         fields = ["name"]
 
     def filter_by_name(self, queryset, name, value):
-        return queryset.filter(
-            Q(name__istartswith=value) | Q(name__icontains=value)
-        )
+        return search_ingredients(queryset, value)
@@ -0,0 +1,101 @@
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models import Prefetch, prefetch_related_objects
+
+from api.serializers import RecipeGetSerializer, get_subscribed_ids
+from food.models import RecipeIngredient, Tag
+
+# Связи, которые читает RecipeGetSerializer.
+RECIPE_PREFETCH = (
+    "author",
+    Prefetch("tags", queryset=Tag.objects.all()),
+    Prefetch(
+        "recipe_ingredient",
+        queryset=RecipeIngredient.objects.select_related("ingredient"),
+    ),
+)
+
+
+class FragmentCache:
+    """Ограниченный LRU-кеш готовых представлений в памяти процесса.
+    Ключ содержит updated_at рецепта, поэтому изменение рецепта,
+    его ингредиентов, тегов или автора само делает запись недоступной,
+    а устаревшие записи вытесняются."""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get_many(self, keys):
+        found = {}
+        with self.lock:
+            for key in keys:
+                value = self.items.get(key)
+                if value is not None:
+                    self.items.move_to_end(key)
+                    found[key] = value
+        return found
+
+    def set_many(self, values):
+        with self.lock:
+            self.items.update(values)
+            for key in values:
+                self.items.move_to_end(key)
+            while len(self.items) > self.max_size:
+                self.items.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+
+
+recipe_fragments = FragmentCache(settings.RECIPE_FRAGMENT_CACHE_SIZE)
+
+
+def overlay(fragment, recipe, subscribed_ids):
+    """Копия представления с флагами текущего пользователя."""
+
+    data = dict(fragment)
+    data["author"] = dict(
+        fragment["author"],
+        is_subscribed=recipe.author_id in subscribed_ids,
+    )
+    data["is_favorited"] = recipe.is_favorited
+    data["is_in_shopping_cart"] = recipe.is_in_shopping_cart
+    return data
+
+
+def serialize_recipes(recipes, context):
+    """Представления рецептов для RecipeGetSerializer.
+    Рецепты должны быть из `Recipe.objects.with_user_flags`.
+    Общая для всех пользователей часть берётся из кеша, для промахов
+    связи подгружаются одним набором запросов; флаги пользователя
+    накладываются поверх. Ссылка на картинку абсолютная, поэтому
+    адрес сайта входит в ключ."""
+
+    request = context["request"]
+    site = request.build_absolute_uri("/")
+    keys = [(recipe.pk, recipe.updated_at, site) for recipe in recipes]
+    fragments = recipe_fragments.get_many(keys)
+    misses = [
+        recipe
+        for recipe, key in zip(recipes, keys)
+        if key not in fragments
+    ]
+    if misses:
+        prefetch_related_objects(misses, *RECIPE_PREFETCH)
+        serializer = RecipeGetSerializer(misses, many=True, context=context)
+        created = {
+            (recipe.pk, recipe.updated_at, site): fragment
+            for recipe, fragment in zip(misses, serializer.data)
+        }
+        recipe_fragments.set_many(created)
+        fragments.update(created)
+    subscribed_ids = get_subscribed_ids(request)
+    return [
+        overlay(fragments[key], recipe, subscribed_ids)
+        for recipe, key in zip(recipes, keys)
+    ]
@@ -1,4 +1,17 @@
-from rest_framework.pagination import PageNumberPagination
+from base64 import b64decode, b64encode
+from binascii import Error as BinasciiError
+from collections import OrderedDict
+
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q, QuerySet
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (BasePagination, PageNumberPagination,
+                                       _positive_int)
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 
 
 class CustomPageNumberPagination(PageNumberPagination):
@@ -7,3 +20,204 @@ class CustomPageNumberPagination(PageNumberPagination):
 
     page_size_query_param = "limit"
     page_size = 6
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator, который для нефильтрованного queryset на PostgreSQL
+    берёт оценку числа строк из статистики планировщика (pg_class).
+    Точный COUNT(*) выполняется, если оценки нет, если queryset
+    отфильтрован или если строк меньше exact_count_threshold."""
+
+    exact_count_threshold = 10000
+
+    count_is_exact = True
+
+    @cached_property
+    def count(self):
+        estimate = self.estimate_count()
+        if estimate is None or estimate < self.exact_count_threshold:
+            self.count_is_exact = True
+            return super().count
+        self.count_is_exact = False
+        return estimate
+
+    def estimate_count(self):
+        queryset = self.object_list
+        if not isinstance(queryset, QuerySet) or queryset.query.where:
+            return None
+        connection = connections[queryset.db]
+        if connection.vendor != "postgresql":
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class "
+                "WHERE oid = %s::regclass",
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        if row is None or row[0] < 0:
+            return None
+        return row[0]
+
+
+class EstimatedCountPagination(CustomPageNumberPagination):
+    """Постраничная пагинация с приблизительным count для больших таблиц.
+    Поле count_is_exact в ответе показывает, точное ли значение count."""
+
+    django_paginator_class = EstimatedCountPaginator
+
+    def get_paginated_response(self, data):
+        return Response(
+            OrderedDict(
+                [
+                    ("count", self.page.paginator.count),
+                    ("count_is_exact", self.page.paginator.count_is_exact),
+                    ("next", self.get_next_link()),
+                    ("previous", self.get_previous_link()),
+                    ("results", data),
+                ]
+            )
+        )
+
+
+class RecipeCursorPagination(BasePagination):
+    """Курсорная пагинация ленты рецептов по ключу (pub_date, id).
+    Курсор хранит pub_date и id крайнего рецепта страницы, следующая
+    страница выбирается условием
+    pub_date < p OR (pub_date = p AND id < i) по индексу (-pub_date, -id)
+    без COUNT(*) и OFFSET. Глубокие страницы отдаются так же быстро,
+    как первая, а рецепты с одинаковым pub_date не повторяются
+    и не теряются."""
+
+    cursor_query_param = "cursor"
+    page_size_query_param = "limit"
+    page_size = 6
+    invalid_cursor_message = "Invalid cursor"
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param],
+                strict=True,
+            )
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def encode_cursor(self, recipe, reverse):
+        position = f"{int(reverse)}|{recipe.pub_date.isoformat()}|{recipe.pk}"
+        return replace_query_param(
+            self.base_url,
+            self.cursor_query_param,
+            b64encode(position.encode()).decode(),
+        )
+
+    def decode_cursor(self, request):
+        """(назад ли, pub_date, id) из курсора или None."""
+
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            reverse, pub_date, pk = (
+                b64decode(encoded.encode(), validate=True)
+                .decode()
+                .split("|")
+            )
+            pub_date = parse_datetime(pub_date)
+            if pub_date is None:
+                raise ValueError
+            return reverse == "1", pub_date, int(pk)
+        except (BinasciiError, UnicodeDecodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        cursor = self.decode_cursor(request)
+        reverse = cursor is not None and cursor[0]
+        if reverse:
+            queryset = queryset.order_by("pub_date", "id")
+        else:
+            queryset = queryset.order_by("-pub_date", "-id")
+        if cursor is not None:
+            _, pub_date, pk = cursor
+            if reverse:
+                position = Q(pub_date__gt=pub_date) | Q(
+                    pub_date=pub_date,
+                    id__gt=pk,
+                )
+            else:
+                position = Q(pub_date__lt=pub_date) | Q(
+                    pub_date=pub_date,
+                    id__lt=pk,
+                )
+            queryset = queryset.filter(position)
+        page = list(queryset[:self.page_size + 1])
+        has_more = len(page) > self.page_size
+        page = page[:self.page_size]
+        if reverse:
+            page.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+        self.page = page
+        return page
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response(
+            OrderedDict(
+                [
+                    ("next", self.get_next_link()),
+                    ("previous", self.get_previous_link()),
+                    ("results", data),
+                ]
+            )
+        )
+
+
+class RecipePagination(EstimatedCountPagination):
+    """Постраничная пагинация с переключением на курсорную.
+    Курсорный режим включается параметром pagination=cursor
+    и сохраняется в ссылках next/previous.
+    Курсор идёт по (pub_date, id), а результаты поиска упорядочены
+    по релевантности, поэтому с параметром search отдаются
+    постранично."""
+
+    mode_query_param = "pagination"
+    cursor_mode = "cursor"
+    cursor_pagination_class = RecipeCursorPagination
+    ranked_query_params = ("search",)
+
+    def use_cursor(self, request):
+        params = request.query_params
+        if params.get(self.mode_query_param) != self.cursor_mode:
+            return False
+        return not any(params.get(param) for param in self.ranked_query_params)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_pagination = None
+        if self.use_cursor(request):
+            self.cursor_pagination = self.cursor_pagination_class()
+            return self.cursor_pagination.paginate_queryset(
+                queryset,
+                request,
+                view,
+            )
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_pagination is not None:
+            return self.cursor_pagination.get_paginated_response(data)
+        return super().get_paginated_response(data)
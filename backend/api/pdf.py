@@ -0,0 +1,53 @@
+import os
+from functools import lru_cache
+from io import BytesIO
+
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFError, TTFont
+from reportlab.pdfgen.canvas import Canvas
+
+from food.utils import batched
+
+PAGE_SIZE = A4
+MARGIN = 56
+FONT_SIZE = 11
+LINE_HEIGHT = 15
+LINES_PER_PAGE = int((PAGE_SIZE[1] - 2 * MARGIN) // LINE_HEIGHT)
+# Встроенный в просмотрщики шрифт, если файла шрифта нет:
+# только латиница, остальные символы не выводятся.
+FALLBACK_FONT = "Helvetica"
+
+
+@lru_cache(maxsize=None)
+def load_font(path):
+    """Регистрирует TrueType-шрифт path в reportlab и возвращает
+    его имя; без файла шрифта - FALLBACK_FONT."""
+
+    name = os.path.splitext(os.path.basename(path))[0]
+    try:
+        pdfmetrics.registerFont(TTFont(name, path))
+    except TTFError:
+        return FALLBACK_FONT
+    return name
+
+
+def text_pdf(lines, font_path):
+    """PDF со строками lines по LINE_HEIGHT на странице A4.
+    В файл встраивается только подмножество шрифта с использованными
+    глифами, текст остаётся текстом и копируется. Строки читаются
+    по мере заполнения страниц, но reportlab собирает документ
+    в памяти, поэтому файл отдаётся одной частью в конце."""
+
+    font = load_font(font_path)
+    buffer = BytesIO()
+    canvas = Canvas(buffer, pagesize=PAGE_SIZE)
+    for page_lines in batched(lines, LINES_PER_PAGE):
+        text = canvas.beginText(MARGIN, PAGE_SIZE[1] - MARGIN - FONT_SIZE)
+        text.setFont(font, FONT_SIZE, LINE_HEIGHT)
+        for line in page_lines:
+            text.textLine(line)
+        canvas.drawText(text)
+        canvas.showPage()
+    canvas.save()
+    yield buffer.getvalue()
@@ -2,25 +2,51 @@ from django.contrib.auth import get_user_model
 from django.db import transaction
 from djoser.serializers import UserCreateSerializer, UserSerializer
 from rest_framework.serializers import (IntegerField, ModelSerializer,
-                                        PrimaryKeyRelatedField, ReadOnlyField,
-                                        SerializerMethodField, ValidationError)
+                                        ReadOnlyField, SerializerMethodField,
+                                        ValidationError)
 
-from api.fields import Base64ImageField
+from api.fields import Base64ImageField, CachedTagField, ImageRenditionField
+from food.cart import add_ingredients_to_carts
 from food.models import (Favourites, Ingredient, Recipe, RecipeIngredient,
-                         ShoppingList, Subscription, Tag)
+                         ShoppingCartIngredient, ShoppingList, Subscription,
+                         Tag)
+from food.search import update_recipe_search
+from jobs.models import Job
 
 User = get_user_model()
 
 
+def get_subscribed_ids(request):
+    """Id авторов, на которых подписан пользователь запроса.
+    Загружаются одним запросом и кешируются на объекте запроса,
+    поэтому общие для всех сериализаторов, получивших его в контексте."""
+
+    if request is None or request.user.is_anonymous:
+        return frozenset()
+    if not hasattr(request, "_subscribed_ids"):
+        request._subscribed_ids = frozenset(
+            Subscription.objects.filter(user=request.user).values_list(
+                "subscribed_id",
+                flat=True,
+            )
+        )
+    return request._subscribed_ids
+
+
 class RecipeMinifiedSerializer(ModelSerializer):
     """Серилизатор рецептов для страници подписок и избранного."""
 
+    image_thumbnail = ImageRenditionField("thumbnail")
+    image_card = ImageRenditionField("card")
+
     class Meta:
         model = Recipe
         fields = (
             "id",
             "name",
             "image",
+            "image_thumbnail",
+            "image_card",
             "cooking_time",
         )
 
@@ -45,13 +71,7 @@ class MeUsersSerializer(UserSerializer):
     def get_is_subscribed(self, obj) -> bool:
         """Возврвщает False если не подписан на этого пользователя."""
 
-        user = self.context.get("request").user
-        if user.is_anonymous:
-            return False
-        return Subscription.objects.filter(
-            user=user,
-            subscribed=obj,
-        ).exists()
+        return obj.id in get_subscribed_ids(self.context.get("request"))
 
 
 class MeUserCreateSerializer(UserCreateSerializer):
@@ -90,13 +110,26 @@ class SubscriptionsSerializer(MeUsersSerializer):
             "recipes_count",
         )
 
-    def get_recipes(self, obj):
-        """мини список рецертов пользователя."""
-        request = self.context.get("request")
-        limit = request.GET.get("recipes_limit")
-        recipes = Recipe.objects.filter(author=obj)
+    @staticmethod
+    def get_recipes_limit(request):
+        """Значение параметра recipes_limit или None."""
+        limit = request.GET.get("recipes_limit") if request else None
         if limit and limit.isdigit():
-            recipes = recipes[: int(limit)]
+            return int(limit)
+        return None
+
+    def get_recipes(self, obj):
+        """мини список рецертов пользователя.
+        Для страницы подписок рецепты всех авторов загружаются заранее
+        и передаются в контексте как recipes_by_author."""
+        recipes_by_author = self.context.get("recipes_by_author")
+        if recipes_by_author is not None:
+            recipes = recipes_by_author.get(obj.id, [])
+        else:
+            limit = self.get_recipes_limit(self.context.get("request"))
+            recipes = Recipe.objects.filter(author=obj)
+            if limit is not None:
+                recipes = recipes[:limit]
         return RecipeMinifiedSerializer(
             recipes,
             many=True,
@@ -106,6 +139,8 @@ class SubscriptionsSerializer(MeUsersSerializer):
     def get_recipes_count(self, obj):
         """Общее количество рецептов пользователя"""
 
+        if hasattr(obj, "recipes_count"):
+            return obj.recipes_count
         return Recipe.objects.filter(author=obj).count()
 
 
@@ -127,6 +162,19 @@ class IngredientSerializer(ModelSerializer):
         read_only_fields = ("__all__",)
 
 
+class ShoppingCartIngredientSerializer(ModelSerializer):
+    """Сериализатор суммы ингредиента в списке покупок."""
+
+    id = ReadOnlyField(source="ingredient.id")
+    name = ReadOnlyField(source="ingredient.name")
+    measurement_unit = ReadOnlyField(source="ingredient.measurement_unit")
+
+    class Meta:
+        model = ShoppingCartIngredient
+        fields = ("id", "name", "measurement_unit", "amount")
+        read_only_fields = ("__all__",)
+
+
 class RecipeIngredientSerializer(ModelSerializer):
     """сериализатор  ингредиентов с количеством для Pecipe."""
 
@@ -154,6 +202,9 @@ class RecipeGetSerializer(ModelSerializer):
         many=True,
         source="recipe_ingredient",
     )
+    image_thumbnail = ImageRenditionField("thumbnail")
+    image_card = ImageRenditionField("card")
+    image_full = ImageRenditionField("full")
     is_favorited = SerializerMethodField()
     is_in_shopping_cart = SerializerMethodField()
     author = MeUsersSerializer()
@@ -169,13 +220,19 @@ class RecipeGetSerializer(ModelSerializer):
             "is_in_shopping_cart",
             "name",
             "image",
+            "image_thumbnail",
+            "image_card",
+            "image_full",
             "text",
             "cooking_time",
         )
         read_only_fields = ("__all__",)
 
     def get_is_favorited(self, obj) -> bool:
-        """Рецепт находиться в избраном."""
+        """Рецепт находиться в избраном.
+        Значение берётся из аннотации `Recipe.objects.with_user_flags`."""
+        if hasattr(obj, "is_favorited"):
+            return obj.is_favorited
         request = self.context.get("request")
         if request is None or request.user.is_anonymous:
             return False
@@ -185,7 +242,10 @@ class RecipeGetSerializer(ModelSerializer):
         ).exists()
 
     def get_is_in_shopping_cart(self, obj) -> bool:
-        """Рецепт находиться в списке покупок."""
+        """Рецепт находиться в списке покупок.
+        Значение берётся из аннотации `Recipe.objects.with_user_flags`."""
+        if hasattr(obj, "is_in_shopping_cart"):
+            return obj.is_in_shopping_cart
         request = self.context.get("request")
         if request is None or request.user.is_anonymous:
             return False
@@ -218,7 +278,7 @@ class RecipeCreatSerializer(ModelSerializer):
         source="recipe_ingredient",
     )
     image = Base64ImageField()
-    tags = PrimaryKeyRelatedField(
+    tags = CachedTagField(
         many=True,
         queryset=Tag.objects.all(),
     )
@@ -265,15 +325,13 @@ class RecipeCreatSerializer(ModelSerializer):
 
         if len(set(tags)) != len(tags):
             raise ValidationError("Теги не должны повторяться.")
-        for tag in tags:
-            if not Ingredient.objects.filter(id=tag.id).exists():
-                raise ValidationError(f"тэг {tag} не существует.")
         return attrs
 
     def create_ingredients(self, recipe, ingredients):
         """Метод для добавления ингредиентов при создания/изменения рецепта."""
 
         recipe_ingredient_objects = []
+        amounts = {}
         for ingredient in ingredients:
             amount = ingredient["amount"]
             ingredient_id = ingredient['id']
@@ -284,7 +342,11 @@ class RecipeCreatSerializer(ModelSerializer):
                     amount=amount,
                 )
             )
+            amounts[ingredient_id] = amount
         RecipeIngredient.objects.bulk_create(recipe_ingredient_objects)
+        # bulk_create не посылает post_save: суммы списков покупок
+        # меняются здесь, удалённые ингредиенты вычел сигнал.
+        add_ingredients_to_carts(recipe.pk, amounts)
 
     def create_tags(self, recipe, tags_data):
         """Метод для добавления tags при создания/изменения рецепта."""
@@ -299,6 +361,7 @@ class RecipeCreatSerializer(ModelSerializer):
         recipe = Recipe.objects.create(**validated_data)
         self.create_tags(recipe, tags_data)
         self.create_ingredients(recipe, ingredients_data)
+        update_recipe_search(Recipe.objects.filter(pk=recipe.pk))
         return recipe
 
     @transaction.atomic
@@ -313,4 +376,22 @@ class RecipeCreatSerializer(ModelSerializer):
         super().update(instance, validated_data)
         self.create_tags(instance, tags_data)
         self.create_ingredients(instance, ingredients_data)
+        update_recipe_search(Recipe.objects.filter(pk=instance.pk))
         return instance
+
+
+class JobSerializer(ModelSerializer):
+    """Статус фоновой задачи. Текст ошибки не отдаётся."""
+
+    class Meta:
+        model = Job
+        fields = (
+            "id",
+            "name",
+            "status",
+            "attempts",
+            "result",
+            "created_at",
+            "finished_at",
+        )
+        read_only_fields = fields
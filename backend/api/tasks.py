@@ -0,0 +1,21 @@
+from api.exports import (EXPORT_FORMATS, ExportDigest, export_cache,
+                         export_digest, shopping_cart_ingredients)
+from jobs.queue import task
+
+
+@task("api.render_export")
+def render_export(user_id, file_format):
+    """Генерирует файл списка покупок в кеш выгрузок.
+    Список читается заново: к моменту выполнения он мог измениться."""
+
+    _, render = EXPORT_FORMATS[file_format]
+    key = export_digest(shopping_cart_ingredients(user_id), file_format).key
+    file = export_cache.get(key)
+    if file is None:
+        digest = ExportDigest(file_format)
+        key, file = export_cache.put(
+            render(digest.rows(shopping_cart_ingredients(user_id))),
+            lambda: digest.key,
+        )
+    file.close()
+    return {"key": key}
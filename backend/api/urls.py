@@ -1,8 +1,8 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from api.views import (IngredientViewSet, MeUsersViewSet, RecipeViewSet,
-                       TagViewSet)
+from api.views import (IngredientViewSet, JobViewSet, MeUsersViewSet,
+                       RecipeViewSet, TagViewSet)
 
 app_name = "api"
 
@@ -11,6 +11,7 @@ router_v1.register("users", MeUsersViewSet, basename="users")
 router_v1.register("tags", TagViewSet, basename="tags")
 router_v1.register("recipes", RecipeViewSet, basename="recipes")
 router_v1.register("ingredients", IngredientViewSet, basename="ingredients")
+router_v1.register("jobs", JobViewSet, basename="jobs")
 
 urlpatterns = [
     path("", include(router_v1.urls)),
@@ -2,9 +2,12 @@ from collections import defaultdict
 from datetime import date
 
 from django.contrib.auth import get_user_model
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.db import transaction
+from django.db.models import Count
+from django.http import FileResponse, Http404
 from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
 from rest_framework import status
@@ -14,14 +17,26 @@ from rest_framework.permissions import (IsAuthenticated,
 from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet
 
+from api.conditional import conditional_response, make_etag, recipe_list_etag
+from api.exports import (EXPORT_BACKGROUND_THRESHOLD, EXPORT_FORMATS,
+                         ExportDigest, export_cache, export_digest,
+                         shopping_cart_ingredients)
 from api.filters import IngredientFilter, RecipeFilter
-from api.pagination import CustomPageNumberPagination
+from api.fragments import RECIPE_PREFETCH, serialize_recipes
+from api.pagination import EstimatedCountPagination, RecipePagination
 from api.permissions import IsAdminAuthorOrReadOnly
-from api.serializers import (IngredientSerializer, RecipeCreatSerializer,
-                             RecipeGetSerializer, RecipeMinifiedSerializer,
-                             SubscriptionsSerializer, TagSerializer)
-from food.models import (Favourites, Ingredient, Recipe, RecipeIngredient,
-                         ShoppingList, Subscription, Tag)
+from api.serializers import (IngredientSerializer, JobSerializer,
+                             RecipeCreatSerializer, RecipeGetSerializer,
+                             RecipeMinifiedSerializer,
+                             ShoppingCartIngredientSerializer,
+                             SubscriptionsSerializer, TagSerializer,
+                             get_subscribed_ids)
+from food.cache import tag_cache
+from food.models import (Favourites, Ingredient, Recipe,
+                         ShoppingCartIngredient, ShoppingList, Subscription,
+                         Tag)
+from jobs.models import Job
+from jobs.queue import enqueue
 
 User = get_user_model()
 
@@ -37,7 +52,7 @@ class MeUsersViewSet(UserViewSet):
     http://localhost/api/users/{id}/subscribe/
     """
 
-    pagination_class = CustomPageNumberPagination
+    pagination_class = EstimatedCountPagination
     queryset = User.objects.all()
     permission_classes = (IsAuthenticatedOrReadOnly,)
 
@@ -58,12 +73,25 @@ class MeUsersViewSet(UserViewSet):
         В выдачу добавляются рецепты."""
 
         user = request.user
-        users_subscribed = User.objects.filter(subscribed__user=user)
+        users_subscribed = (
+            User.objects.filter(subscribed__user=user)
+            .annotate(recipes_count=Count("pecipes"))
+            .order_by(*User._meta.ordering)
+        )
         pages = self.paginate_queryset(users_subscribed)
+        recipes_by_author = defaultdict(list)
+        for recipe in Recipe.objects.latest_for_authors(
+            pages,
+            SubscriptionsSerializer.get_recipes_limit(request),
+        ):
+            recipes_by_author[recipe.author_id].append(recipe)
         serializer = SubscriptionsSerializer(
             pages,
             many=True,
-            context={"request": request},
+            context={
+                "request": request,
+                "recipes_by_author": recipes_by_author,
+            },
         )
         return self.get_paginated_response(serializer.data)
 
@@ -152,26 +180,72 @@ class IngredientViewSet(ModelViewSet):
 
 
 class TagViewSet(ModelViewSet):
-    """GET Cписок тегов, Получение тега."""
+    """GET Cписок тегов, Получение тега.
+    Теги отдаются из кеша в памяти процесса с сильным ETag."""
 
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     http_method_names = ("get",)
     permission_classes = (IsAuthenticatedOrReadOnly,)
 
+    def conditional_response(self, request, tags, data):
+        etag = tag_cache.etag(tags)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = Response(data())
+        response["ETag"] = etag
+        return response
+
+    def list(self, request, *args, **kwargs):
+        tags = tag_cache.all()
+        return self.conditional_response(
+            request,
+            tags,
+            lambda: self.get_serializer(tags, many=True).data,
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            tag = tag_cache.get(int(kwargs["pk"]))
+        except ValueError:
+            tag = None
+        if tag is None:
+            raise Http404
+        return self.conditional_response(
+            request,
+            (tag,),
+            lambda: self.get_serializer(tag).data,
+        )
+
 
 class RecipeViewSet(ModelViewSet):
     """Страница доступна всем пользователям.
     Рецепты на всех страницах сортируются по дате публикации (новые — выше).
-    Доступна фильтрация по избранному, автору, списку покупок и тегам."""
+    Доступна фильтрация по избранному, автору, списку покупок и тегам.
+    Для бесконечной ленты - курсорная пагинация: ?pagination=cursor,
+    результаты поиска (?search=) отдаются постранично по релевантности.
+    Список и рецепт отдаются с ETag и отвечают 304 на If-None-Match,
+    анонимным пользователям рецепт отдаётся и с Last-Modified."""
 
-    queryset = Recipe.objects.all()
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
-    pagination_class = CustomPageNumberPagination
+    pagination_class = RecipePagination
     permission_classes = [IsAdminAuthorOrReadOnly,
                           IsAuthenticatedOrReadOnly]
 
+    def get_queryset(self):
+        """Фиксированный план запросов для `RecipeGetSerializer`:
+        флаги избранного и списка покупок - подзапросами,
+        автор, теги и ингредиенты - отдельными запросами на всю
+        страницу сразу. Число запросов не зависит от размера страницы.
+        Для списка и просмотра связи подгружаются в `serialize_recipes`
+        только для рецептов, которых нет в кеше представлений."""
+
+        queryset = Recipe.objects.with_user_flags(self.request.user)
+        if self.action in ("list", "retrieve"):
+            return queryset
+        return queryset.prefetch_related(*RECIPE_PREFETCH)
+
     def get_serializer_class(self):
         """Будет использоваться сериализатор `RecipeGetSerializer`
         а для остальных методов
@@ -184,45 +258,155 @@ class RecipeViewSet(ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            recipes, envelope = list(queryset), None
+        else:
+            recipes = page
+            envelope = self.get_paginated_response(None).data
+
+        def render():
+            data = serialize_recipes(recipes, self.get_serializer_context())
+            if page is None:
+                return Response(data)
+            return self.get_paginated_response(data)
+
+        return conditional_response(
+            request,
+            recipe_list_etag(request, recipes, envelope),
+            render,
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        """Валидатор считается одним запросом без сериализатора:
+        время изменения рецепта и флаги пользователя.
+        Last-Modified отдаётся только анонимным пользователям -
+        у остальных флаги меняются независимо от updated_at."""
+
+        try:
+            pk = int(kwargs["pk"])
+        except ValueError:
+            raise Http404
+        state = (
+            Recipe.objects.with_user_flags(request.user)
+            .filter(pk=pk)
+            .values_list(
+                "updated_at",
+                "is_favorited",
+                "is_in_shopping_cart",
+                "author_id",
+            )
+            .first()
+        )
+        if state is None:
+            raise Http404
+        updated_at, is_favorited, is_in_shopping_cart, author_id = state
+        etag = make_etag(
+            pk,
+            updated_at.isoformat(),
+            is_favorited,
+            is_in_shopping_cart,
+            author_id in get_subscribed_ids(request),
+        )
+        return conditional_response(
+            request,
+            etag,
+            lambda: Response(
+                serialize_recipes(
+                    [self.get_object()],
+                    self.get_serializer_context(),
+                )[0]
+            ),
+            last_modified=updated_at if request.user.is_anonymous else None,
+        )
+
     @action(
         methods=["GET"],
         detail=False,
         permission_classes=[IsAuthenticated],
     )
     def download_shopping_cart(self, request):
-        """Скачать файл TXT со списком покупок.
+        """Скачать файл со списком покупок.
+        Формат задаётся параметром file_format: txt (по умолчанию),
+        csv, json или pdf. Готовые файлы кешируются на диске по хешу
+        содержимого списка, ETag позволяет не скачивать файл повторно.
+        PDF выводится шрифтом settings.SHOPPING_LIST_FONT: символы,
+        которых в нём нет, видны как пустые прямоугольники, но при
+        копировании текста сохраняются. Без файла шрифта используется
+        Helvetica, и в PDF выводится только латиница.
         Доступно только авторизованным пользователям."""
 
-        today_cart = date.today()
-
-        user = request.user
-        list_ingredients = (
-            RecipeIngredient.objects.filter(recipe__shopping_list__user=user)
-            .values(
-                "ingredient__name",
-                "ingredient__measurement_unit",
+        file_format = request.query_params.get("file_format", "txt")
+        if file_format not in EXPORT_FORMATS:
+            return Response(
+                {"file_format": f"Допустимые форматы: "
+                                f"{', '.join(EXPORT_FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST,
             )
-            .annotate(amount_sum=Sum("amount"))
+        content_type, render = EXPORT_FORMATS[file_format]
+        digest = export_digest(
+            shopping_cart_ingredients(request.user),
+            file_format,
         )
-
-        summed_ingredients = defaultdict(float)
-        for item in list_ingredients:
-            key = (
-                item["ingredient__name"],
-                item["ingredient__measurement_unit"],
+        key = digest.key
+        etag = f'"{key}"'
+        response = get_conditional_response(request, etag=etag)
+        if response is not None:
+            response["ETag"] = etag
+            return response
+        file = export_cache.get(key)
+        if file is None:
+            if digest.count > EXPORT_BACKGROUND_THRESHOLD:
+                job = enqueue(
+                    "api.render_export",
+                    {"user_id": request.user.pk, "file_format": file_format},
+                    user=request.user,
+                    key=f"export:{key}",
+                )
+                return Response(
+                    {
+                        "detail": "Файл готовится, повторите запрос позже.",
+                        "job": request.build_absolute_uri(
+                            reverse("api:jobs-detail", args=(job.pk,))
+                        ),
+                    },
+                    status=status.HTTP_202_ACCEPTED,
+                    headers={"Retry-After": "2"},
+                )
+            # Список читается второй раз; если он успел измениться,
+            # ключ будет у нового содержимого.
+            digest = ExportDigest(file_format)
+            key, file = export_cache.put(
+                render(digest.rows(shopping_cart_ingredients(request.user))),
+                lambda: digest.key,
             )
-            summed_ingredients[key] += item["amount_sum"]
+        response = FileResponse(
+            file,
+            as_attachment=True,
+            filename=f"список_покупок_{date.today()}.{file_format}",
+            content_type=content_type,
+        )
+        response["ETag"] = f'"{key}"'
+        response["Cache-Control"] = "private, no-cache"
+        return response
 
-        shopping_list = [f"Список продуктов на {today_cart}:\n \n"]
-        for key, value in summed_ingredients.items():
-            name = key[0]
-            unit = key[1]
-            shopping_list.append(f"{name}: {value} {unit}\n")
+    @action(
+        methods=["GET"],
+        detail=False,
+        permission_classes=[IsAuthenticated],
+    )
+    def shopping_cart_summary(self, request):
+        """Сводка списка покупок: ингредиенты с суммарным количеством."""
 
-        filename = f"список_покупок_{date.today()}.txt"
-        response = HttpResponse(shopping_list, content_type="text/plain")
-        response["Content-Disposition"] = f"attachment; filename={filename}"
-        return response
+        serializer = ShoppingCartIngredientSerializer(
+            ShoppingCartIngredient.objects.filter(
+                user=request.user,
+            ).select_related("ingredient").order_by("ingredient__name"),
+            many=True,
+        )
+        return Response(serializer.data)
 
     def add_a_recipe_to_the_list(self, user, Model, kwargs):
         """Метод для добавления рецепта в список избранного или покупок.
@@ -240,10 +424,12 @@ class RecipeViewSet(ModelViewSet):
             user=user,
             recipe=recipe,
         ).exists():
-            Model.objects.create(
-                user=user,
-                recipe=recipe,
-            )
+            with transaction.atomic():
+                # Суммы списка покупок меняют сигналы ShoppingList.
+                Model.objects.create(
+                    user=user,
+                    recipe=recipe,
+                )
             serializer = RecipeMinifiedSerializer(recipe)
             return Response(
                 data=serializer.data,
@@ -262,10 +448,11 @@ class RecipeViewSet(ModelViewSet):
             user=user,
             recipe=recipe,
         ).exists():
-            Model.objects.filter(
-                user=user,
-                recipe=recipe,
-            ).delete()
+            with transaction.atomic():
+                Model.objects.filter(
+                    user=user,
+                    recipe=recipe,
+                ).delete()
             return Response(
                 {"Рецепт успешно удален из избранного"},
                 status=status.HTTP_204_NO_CONTENT,
@@ -326,3 +513,14 @@ class RecipeViewSet(ModelViewSet):
             {"detail": "Метод не разрешен"},
             status=status.HTTP_405_METHOD_NOT_ALLOWED,
         )
+
+
+class JobViewSet(ModelViewSet):
+    """Статус фоновых задач текущего пользователя."""
+
+    serializer_class = JobSerializer
+    http_method_names = ("get",)
+    permission_classes = (IsAuthenticated,)
+
+    def get_queryset(self):
+        return Job.objects.filter(user=self.request.user)
@@ -0,0 +1,23 @@
+import os
+
+import pytest
+
+# Тесты идут на SQLite (TEST_DATABASES), ключ нужен только для запуска.
+os.environ.setdefault("TEST_DATABASES", "True")
+os.environ.setdefault("SECRET_KEY", "tests")
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "foodgram.settings")
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path, monkeypatch):
+    """Загруженные картинки и кеш файлов - во временном каталоге."""
+
+    from api.exports import export_cache
+
+    settings.MEDIA_ROOT = str(tmp_path / "media")
+    settings.SHOPPING_LIST_CACHE_DIR = str(tmp_path / "cache")
+    monkeypatch.setattr(
+        export_cache,
+        "directory",
+        settings.SHOPPING_LIST_CACHE_DIR,
+    )
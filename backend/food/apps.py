@@ -5,3 +5,12 @@ class FoodConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "food"
     verbose_name = "Рецепты"
+
+    def ready(self):
+        from PIL import Image
+
+        import food.signals  # noqa: F401
+        from food.constants import IMAGE_MAX_PIXELS
+
+        # Жёсткий предел для Pillow: картинки больше не открываются.
+        Image.MAX_IMAGE_PIXELS = IMAGE_MAX_PIXELS
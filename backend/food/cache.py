@@ -0,0 +1,101 @@
+import hashlib
+import threading
+from time import monotonic
+from uuid import uuid4
+
+from django.conf import settings
+from django.db import transaction
+
+from food.models import CacheVersion, Tag
+
+INGREDIENTS_VERSION = "ingredients"
+TAGS_VERSION = "tags"
+
+# Прочитанные версии: {name: (версия, время чтения по monotonic)}.
+_versions = {}
+
+
+def get_version(name):
+    """Текущая версия справочника name.
+    Процессы сравнивают её со своей копией данных и перестраивают
+    копию при расхождении. Версия хранится в базе: изменения из любого
+    процесса (воркеры gunicorn, фоновые задачи, команды) видны
+    остальным. Прочитанная версия запоминается на CACHE_VERSION_TTL
+    секунд, поэтому чужие изменения видны с такой задержкой,
+    а запросов к базе - не больше одного за это время."""
+
+    now = monotonic()
+    cached = _versions.get(name)
+    if cached is not None and now - cached[1] < settings.CACHE_VERSION_TTL:
+        return cached[0]
+    version = (
+        CacheVersion.objects.filter(name=name)
+        .values_list("version", flat=True)
+        .first()
+    ) or ""
+    _versions[name] = (version, now)
+    return version
+
+
+def bump_version(name):
+    """Выдаёт справочнику name новую метку версии.
+    Свой процесс видит её сразу."""
+
+    CacheVersion.objects.update_or_create(
+        name=name,
+        defaults={"version": uuid4().hex},
+    )
+    _versions.pop(name, None)
+    # До фиксации другой поток мог прочитать и запомнить старую.
+    transaction.on_commit(lambda: _versions.pop(name, None))
+
+
+class TagCache:
+    """Теги в памяти процесса.
+    Таблица маленькая и почти не меняется, поэтому читается целиком
+    и перечитывается только при смене версии TAGS_VERSION,
+    которую меняют сигналы сохранения и удаления Tag."""
+
+    def __init__(self):
+        self.version = None
+        self.tags = ()
+        self.by_id = {}
+        self.lock = threading.Lock()
+
+    def refresh(self):
+        version = get_version(TAGS_VERSION)
+        if self.version == version:
+            return
+        with self.lock:
+            if self.version == version:
+                return
+            tags = tuple(Tag.objects.all())
+            self.by_id = {tag.pk: tag for tag in tags}
+            self.tags = tags
+            self.version = version
+
+    def all(self):
+        self.refresh()
+        return self.tags
+
+    def get(self, pk):
+        self.refresh()
+        return self.by_id.get(pk)
+
+    def slug_choices(self):
+        return [(tag.slug, tag.name) for tag in self.all()]
+
+    @staticmethod
+    def etag(tags):
+        """Сильный ETag по содержимому тегов."""
+
+        digest = hashlib.sha256()
+        for tag in tags:
+            digest.update(
+                f"{tag.pk}\x1f{tag.name}\x1f{tag.color}\x1f{tag.slug}\x1e"
+                .encode()
+            )
+        return f'"{digest.hexdigest()}"'
+
+
+tag_cache = TagCache()
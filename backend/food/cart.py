@@ -0,0 +1,182 @@
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import Sum
+
+from food.models import RecipeIngredient, ShoppingCartIngredient, ShoppingList
+
+# Остаток меньше этого значения считается нулём (погрешность float).
+AMOUNT_EPSILON = 1e-6
+# Попыток изменить суммы при гонке вставок одной строки.
+CART_RETRIES = 3
+
+
+def recipe_amounts(recipe_id):
+    """Количество каждого ингредиента в рецепте: {ingredient_id: amount}."""
+
+    amounts = defaultdict(float)
+    for ingredient_id, amount in RecipeIngredient.objects.filter(
+        recipe_id=recipe_id,
+    ).values_list("ingredient_id", "amount"):
+        amounts[ingredient_id] += amount
+    return amounts
+
+
+def locked_cart_items(user_ids, deltas):
+    """Существующие суммы пользователей по ингредиентам deltas,
+    заблокированные до конца транзакции."""
+
+    return {
+        (item.user_id, item.ingredient_id): item
+        for item in ShoppingCartIngredient.objects.select_for_update().filter(
+            user_id__in=user_ids,
+            ingredient_id__in=deltas,
+        )
+    }
+
+
+def apply_cart_deltas(user_ids, deltas):
+    items = locked_cart_items(user_ids, deltas)
+    to_create, to_update, to_delete = [], [], []
+    for user_id in user_ids:
+        for ingredient_id, delta in deltas.items():
+            item = items.get((user_id, ingredient_id))
+            if item is None:
+                if delta > AMOUNT_EPSILON:
+                    to_create.append(
+                        ShoppingCartIngredient(
+                            user_id=user_id,
+                            ingredient_id=ingredient_id,
+                            amount=delta,
+                        )
+                    )
+                continue
+            item.amount += delta
+            if item.amount > AMOUNT_EPSILON:
+                to_update.append(item)
+            else:
+                to_delete.append(item.pk)
+    ShoppingCartIngredient.objects.bulk_create(to_create)
+    ShoppingCartIngredient.objects.bulk_update(to_update, ("amount",))
+    ShoppingCartIngredient.objects.filter(pk__in=to_delete).delete()
+
+
+def change_cart_totals(user_ids, deltas):
+    """Прибавляет deltas {ingredient_id: amount} к суммам
+    в списках покупок пользователей user_ids.
+    Нулевые суммы удаляются, новые ингредиенты добавляются.
+    Если ту же сумму успела создать параллельная транзакция,
+    вставка нарушает уникальность: изменение откатывается
+    до точки сохранения и повторяется уже с её строкой."""
+
+    deltas = {
+        ingredient_id: delta
+        for ingredient_id, delta in deltas.items()
+        if abs(delta) > AMOUNT_EPSILON
+    }
+    user_ids = list(user_ids)
+    if not deltas or not user_ids:
+        return
+    for attempt in range(CART_RETRIES):
+        try:
+            with transaction.atomic():
+                apply_cart_deltas(user_ids, deltas)
+            return
+        except IntegrityError:
+            if attempt == CART_RETRIES - 1:
+                raise
+
+
+def add_recipe_to_cart(user_id, recipe_id):
+    """Рецепт добавлен в список покупок пользователя."""
+
+    change_cart_totals((user_id,), recipe_amounts(recipe_id))
+
+
+def remove_recipe_from_cart(user_id, recipe_id):
+    """Рецепт удалён из списка покупок пользователя."""
+
+    amounts = recipe_amounts(recipe_id)
+    change_cart_totals(
+        (user_id,),
+        {ingredient_id: -amount for ingredient_id, amount in amounts.items()},
+    )
+
+
+def cart_user_ids(recipe_id):
+    return ShoppingList.objects.filter(recipe_id=recipe_id).values_list(
+        "user_id",
+        flat=True,
+    )
+
+
+def add_ingredients_to_carts(recipe_id, amounts):
+    """К рецепту добавлены ингредиенты amounts {ingredient_id: amount}
+    (отрицательные - убраны): разница применяется ко всем спискам
+    покупок, где лежит рецепт."""
+
+    change_cart_totals(cart_user_ids(recipe_id), amounts)
+
+
+def live_cart_totals(user_ids=None):
+    """Суммы, посчитанные заново по рецептам в списках покупок:
+    {(user_id, ingredient_id): amount}."""
+
+    rows = ShoppingList.objects.filter(
+        recipe__recipe_ingredient__isnull=False,
+    )
+    if user_ids is not None:
+        rows = rows.filter(user_id__in=user_ids)
+    rows = (
+        rows.values("user_id", "recipe__recipe_ingredient__ingredient_id")
+        .annotate(amount_sum=Sum("recipe__recipe_ingredient__amount"))
+        .order_by()
+        .values_list(
+            "user_id",
+            "recipe__recipe_ingredient__ingredient_id",
+            "amount_sum",
+        )
+    )
+    return {
+        (user_id, ingredient_id): amount
+        for user_id, ingredient_id, amount in rows.iterator()
+    }
+
+
+def stored_cart_totals(user_ids=None):
+    """Суммы из таблицы ShoppingCartIngredient."""
+
+    items = ShoppingCartIngredient.objects.all()
+    if user_ids is not None:
+        items = items.filter(user_id__in=user_ids)
+    return {
+        (user_id, ingredient_id): amount
+        for user_id, ingredient_id, amount in items.values_list(
+            "user_id",
+            "ingredient_id",
+            "amount",
+        ).iterator()
+    }
+
+
+@transaction.atomic
+def rebuild_cart_totals(user_ids=None):
+    """Пересобирает таблицу ShoppingCartIngredient с нуля."""
+
+    items = ShoppingCartIngredient.objects.all()
+    if user_ids is not None:
+        items = items.filter(user_id__in=user_ids)
+    items.delete()
+    ShoppingCartIngredient.objects.bulk_create(
+        (
+            ShoppingCartIngredient(
+                user_id=user_id,
+                ingredient_id=ingredient_id,
+                amount=amount,
+            )
+            for (user_id, ingredient_id), amount in live_cart_totals(
+                user_ids
+            ).items()
+        ),
+        batch_size=1000,
+    )
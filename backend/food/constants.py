@@ -12,6 +12,27 @@ FIELD_MAX_AMOUNT = 999999
 FIELD_MIN_TIME = 1
 FIELD_MAX_TIME = 999
 
+# Search
+
+SEARCH_CONFIG = "russian"
+RECIPE_FTS_TABLE = "food_recipe_fts"
+
+# Images
+
+IMAGE_MAX_SIZE = 10 * 1024 * 1024
+IMAGE_MAX_PIXELS = 25_000_000
+# Кратно 4, чтобы каждая порция base64 декодировалась отдельно.
+BASE64_CHUNK_SIZE = 64 * 1024
+# Уменьшенные копии картинки рецепта: название - максимальный размер.
+IMAGE_RENDITIONS = {
+    "thumbnail": (160, 160),
+    "card": (480, 480),
+    "full": (1280, 1280),
+}
+RENDITION_QUALITY = 80
+# Сколько имён готовых копий процесс помнит, не проверяя файлы.
+READY_RENDITIONS_LIMIT = 100_000
+
 # Users
 
 EMAIL_MAX_LENGTH = 254
@@ -0,0 +1,164 @@
+import csv
+import gzip
+import os
+from array import array
+from bisect import bisect_left
+from time import perf_counter
+
+from django.db.models import Count, Exists, Max, OuterRef, Q
+
+from food.importers import (AuthorImporter, IngredientImporter, RecipeImporter,
+                            RecipeIngredientImporter, RecipeTagImporter,
+                            TagImporter)
+from food.models import Ingredient, Recipe
+
+CHUNK_SIZE = 2000
+
+
+class ExportStats:
+    """Итог выгрузки одной таблицы."""
+
+    def __init__(self, table, path):
+        self.table = table
+        self.path = path
+        self.rows = 0
+        self.bytes = 0
+        self.seconds = 0.0
+
+    @property
+    def rate(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        return (
+            f"{self.table} -> {self.path}: строк {self.rows}, "
+            f"{self.bytes / 2 ** 20:.1f} МБ; "
+            f"{self.seconds:.2f} с, {self.rate:.0f} строк/с"
+        )
+
+
+class CSVExporter:
+    """Выгрузка таблицы импортёра importer_class в CSV того же формата.
+    Строки читаются курсором порциями по chunk_size (в PostgreSQL -
+    серверным) и сразу пишутся в файл, поэтому память не зависит
+    от размера таблицы."""
+
+    importer_class = None
+
+    def __init__(self, directory, compress=False, chunk_size=CHUNK_SIZE):
+        filename = self.importer_class.filename + (".gz" if compress else "")
+        self.path = os.path.join(directory, filename)
+        self.compress = compress
+        self.chunk_size = chunk_size
+
+    def queryset(self):
+        model = self.importer_class.model
+        return model._default_manager.order_by("pk").values_list(
+            *self.importer_class.csv_columns.values(),
+        )
+
+    def rows(self):
+        return self.queryset().iterator(chunk_size=self.chunk_size)
+
+    def open(self):
+        if self.compress:
+            return gzip.open(self.path, "wt", encoding="utf-8", newline="")
+        return open(self.path, "w", encoding="utf-8", newline="")
+
+    def run(self):
+        table = self.importer_class.model._meta.db_table
+        stats = ExportStats(table, self.path)
+        start = perf_counter()
+        with self.open() as file:
+            writer = csv.writer(file)
+            writer.writerow(self.importer_class.csv_columns)
+            for row in self.rows():
+                writer.writerow(row)
+                stats.rows += 1
+        stats.bytes = os.path.getsize(self.path)
+        stats.seconds = perf_counter() - start
+        return stats
+
+
+class IngredientPositions:
+    """Номера ингредиентов в выгрузке вместо id.
+    В ingredients.csv нет id: при загрузке ингредиенты получают id
+    по порядку строк, и ссылки recipe_ingredients.csv указывают
+    на эти номера. Если id в базе идут подряд с 1, они совпадают
+    с номерами; иначе номер ищется по отсортированному массиву id
+    (8 байт на ингредиент)."""
+
+    def __init__(self):
+        totals = Ingredient.objects.aggregate(
+            count=Count("pk"),
+            last=Max("pk"),
+        )
+        self.ids = None
+        if totals["count"] != (totals["last"] or 0):
+            self.ids = array(
+                "q",
+                Ingredient.objects.order_by("pk")
+                .values_list("pk", flat=True)
+                .iterator(chunk_size=CHUNK_SIZE * 10),
+            )
+
+    def __getitem__(self, pk):
+        if self.ids is None:
+            return pk
+        return bisect_left(self.ids, pk) + 1
+
+
+class TagExporter(CSVExporter):
+    importer_class = TagImporter
+
+
+class IngredientExporter(CSVExporter):
+    importer_class = IngredientImporter
+
+
+class AuthorExporter(CSVExporter):
+    """Пользователи - только колонки AuthorImporter, без паролей и прав.
+    Сотрудники и суперпользователи выгружаются с include_staff
+    или если у них есть рецепты: на них ссылается recipe.csv."""
+
+    importer_class = AuthorImporter
+
+    def __init__(self, directory, include_staff=False, **kwargs):
+        super().__init__(directory, **kwargs)
+        self.include_staff = include_staff
+
+    def queryset(self):
+        queryset = super().queryset()
+        if self.include_staff:
+            return queryset
+        return queryset.filter(
+            Exists(Recipe.objects.filter(author=OuterRef("pk")))
+            | Q(is_staff=False, is_superuser=False)
+        )
+
+
+class RecipeExporter(CSVExporter):
+    importer_class = RecipeImporter
+
+
+class RecipeIngredientExporter(CSVExporter):
+    importer_class = RecipeIngredientImporter
+
+    def rows(self):
+        positions = IngredientPositions()
+        for recipe_id, ingredient_id, amount in super().rows():
+            yield recipe_id, positions[ingredient_id], amount
+
+
+class RecipeTagExporter(CSVExporter):
+    importer_class = RecipeTagImporter
+
+
+EXPORTERS = (
+    TagExporter,
+    IngredientExporter,
+    AuthorExporter,
+    RecipeExporter,
+    RecipeIngredientExporter,
+    RecipeTagExporter,
+)
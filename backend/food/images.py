@@ -0,0 +1,157 @@
+import os
+from datetime import timedelta
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.utils import timezone
+from PIL import Image, ImageOps, features
+
+from food.constants import (IMAGE_RENDITIONS, READY_RENDITIONS_LIMIT,
+                            RENDITION_QUALITY)
+from food.models import Recipe
+from jobs.queue import enqueue
+
+# WebP, если Pillow собран с libwebp, иначе JPEG.
+if features.check("webp"):
+    RENDITION_FORMAT, RENDITION_EXTENSION = "WEBP", "webp"
+else:
+    RENDITION_FORMAT, RENDITION_EXTENSION = "JPEG", "jpg"
+
+# Имена копий, которые уже есть в хранилище. Имя копии определяется
+# содержимым оригинала, поэтому готовая копия под ним не меняется.
+_ready_renditions = set()
+# Оригиналы, для которых процесс уже поставил задачу создания копий.
+_requested_renditions = set()
+
+
+def rendition_name(name, rendition):
+    """Имя копии рядом с оригиналом: images/cake.png -> images/cake.card.jpg"""
+
+    root, _ = os.path.splitext(name)
+    return f"{root}.{rendition}.{RENDITION_EXTENSION}"
+
+
+def prepare(image):
+    """Приводит режим картинки к поддерживаемому форматом копий.
+    В JPEG прозрачность заменяется белым фоном."""
+
+    if image.mode == "P":
+        image = image.convert("RGBA")
+    if "A" not in image.getbands():
+        return image if image.mode == "RGB" else image.convert("RGB")
+    if image.mode != "RGBA":
+        image = image.convert("RGBA")
+    if RENDITION_FORMAT == "WEBP":
+        return image
+    background = Image.new("RGB", image.size, "white")
+    background.paste(image, mask=image.getchannel("A"))
+    return background
+
+
+def make_renditions(image, renditions=IMAGE_RENDITIONS):
+    """Создаёт недостающие копии картинки image (FieldFile).
+    Возвращает False, если оригинал не удалось прочитать."""
+
+    storage = image.storage
+    missing = {
+        rendition: size
+        for rendition, size in renditions.items()
+        if not storage.exists(rendition_name(image.name, rendition))
+    }
+    if not missing:
+        return True
+    try:
+        with storage.open(image.name) as file, Image.open(file) as original:
+            # JPEG сразу распаковывается в уменьшенном масштабе.
+            original.draft("RGB", max(missing.values()))
+            original = ImageOps.exif_transpose(original)
+            for rendition, size in missing.items():
+                copy = original.copy()
+                copy.thumbnail(size, Image.LANCZOS)
+                buffer = BytesIO()
+                prepare(copy).save(
+                    buffer,
+                    RENDITION_FORMAT,
+                    quality=RENDITION_QUALITY,
+                )
+                storage.save(
+                    rendition_name(image.name, rendition),
+                    ContentFile(buffer.getvalue()),
+                )
+    except OSError:
+        return False
+    return True
+
+
+def remember(names, name):
+    if len(names) >= READY_RENDITIONS_LIMIT:
+        names.clear()
+    names.add(name)
+
+
+def rendition_ready(storage, name):
+    if name in _ready_renditions:
+        return True
+    if not storage.exists(name):
+        return False
+    remember(_ready_renditions, name)
+    return True
+
+
+def rendition_url(image, rendition):
+    """Адрес копии. Пока копии нет, отдаётся адрес оригинала,
+    а копии создаёт фоновая задача: запрос картинку не декодирует.
+    Задача ставится один раз на процесс, и нечитаемый оригинал
+    не ставит её на каждый запрос."""
+
+    name = rendition_name(image.name, rendition)
+    if rendition_ready(image.storage, name):
+        return image.storage.url(name)
+    if image.name not in _requested_renditions:
+        enqueue(
+            "food.make_renditions",
+            {"name": image.name},
+            key=f"renditions:{image.name}",
+        )
+        remember(_requested_renditions, image.name)
+    return image.url
+
+
+def release_image(name):
+    """Ставит отложенное удаление картинки, на которую перестал
+    ссылаться рецепт. Задача фиксируется вместе с транзакцией."""
+
+    if name:
+        enqueue(
+            "food.release_image",
+            {"name": name},
+            key=f"release:{name}",
+            delay=settings.IMAGE_RELEASE_DELAY,
+        )
+
+
+def delete_unused_image(name):
+    """Удаляет картинку и её копии, если на неё не ссылается ни один
+    рецепт. Одинаковые картинки хранятся одним файлом, поэтому файл
+    живёт, пока нужен хоть одному рецепту.
+    Рецепт с той же картинкой может сохраняться прямо сейчас и ещё
+    не виден в базе; сохранение обновляет время изменения файла,
+    и недавно сохранённый файл проверяется ещё раз позже.
+    Возвращает True, если файл удалён."""
+
+    storage = Recipe._meta.get_field("image").storage
+    if Recipe.objects.filter(image=name).exists() or not storage.exists(name):
+        return False
+    grace = timedelta(seconds=settings.IMAGE_RELEASE_DELAY)
+    if storage.get_modified_time(name) > timezone.now() - grace:
+        enqueue(
+            "food.release_image",
+            {"name": name},
+            delay=settings.IMAGE_RELEASE_DELAY,
+        )
+        return False
+    storage.delete(name)
+    for rendition in IMAGE_RENDITIONS:
+        storage.delete(rendition_name(name, rendition))
+    return True
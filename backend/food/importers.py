@@ -0,0 +1,822 @@
+import csv
+import gzip
+import hashlib
+import os
+import sys
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import nullcontext
+from datetime import timedelta
+from time import perf_counter
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import DatabaseError, connection, connections, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from food.cache import INGREDIENTS_VERSION, TAGS_VERSION, bump_version
+from food.models import (ImportCheckpoint, Ingredient, Recipe,
+                         RecipeIngredient, Tag)
+from food.search import update_recipe_search
+from food.utils import batched
+
+User = get_user_model()
+
+DATA_ROOT = os.path.join(settings.BASE_DIR, "data")
+BATCH_SIZE = 5000
+# Путь, означающий стандартный ввод.
+STDIN = "-"
+# Значений первого поля ключа в одном запросе существующих ключей.
+LOOKUP_SIZE = 500
+CHECKSUM_CHUNK_SIZE = 1024 * 1024
+
+
+def reset_sequences(model):
+    """Сдвигает последовательность id после вставки явных id
+    (PostgreSQL; в SQLite запросов нет)."""
+
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), (model,)):
+            cursor.execute(sql)
+
+
+def file_checksum(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        while chunk := file.read(CHECKSUM_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class CSVStream:
+    """Строки CSV из двоичного файла, читаемого построчно.
+    offset - смещение в байтах конца последней прочитанной строки:
+    с него можно продолжить чтение того же файла."""
+
+    def __init__(self, file, offset=0):
+        self.file = file
+        header = file.readline()
+        self.fieldnames = next(csv.reader([header.decode("utf-8-sig")]), [])
+        self.offset = len(header)
+        if offset > self.offset:
+            file.seek(offset)
+            self.offset = offset
+
+    def lines(self):
+        for line in self.file:
+            self.offset += len(line)
+            yield line.decode("utf-8")
+
+    def __iter__(self):
+        return csv.DictReader(self.lines(), fieldnames=self.fieldnames)
+
+
+class ImportStats:
+    """Итог загрузки одной таблицы."""
+
+    def __init__(self, table):
+        self.table = table
+        self.rows = 0
+        self.created = 0
+        self.skipped = 0
+        self.invalid = 0
+        self.seconds = 0.0
+        # Байт файла, загруженных прошлыми запусками.
+        self.resumed_from = 0
+        # Файл с тем же содержимым уже загружен полностью.
+        self.unchanged = False
+
+    @property
+    def rate(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        if self.unchanged:
+            return f"{self.table}: файл уже загружен, пропущен"
+        resumed = (
+            f", продолжено с байта {self.resumed_from}"
+            if self.resumed_from else ""
+        )
+        return (
+            f"{self.table}: строк {self.rows}, создано {self.created}, "
+            f"уже были {self.skipped}, с ошибками {self.invalid}; "
+            f"{self.seconds:.2f} с, {self.rate:.0f} строк/с{resumed}"
+        )
+
+
+class CSVImporter:
+    """Загрузка CSV пакетами, по умолчанию из data/.
+    Естественные ключи существующих записей и id связанных таблиц
+    читаются заранее, поэтому на пакет приходится один INSERT
+    в своей транзакции, а не два запроса на строку.
+    Строки с уже существующим ключом пропускаются, строки
+    с некорректными значениями или ссылками считаются ошибочными.
+    С checkpoint=True после каждого пакета в той же транзакции
+    сохраняется смещение в файле: прерванная загрузка продолжается
+    с него, а полностью загруженный файл пропускается."""
+
+    model = None
+    filename = None
+    # Поля модели, по которым строка считается уже загруженной.
+    key_fields = ("id",)
+    # Поля-ссылки модели и модели, в которых должны быть их id.
+    references = {}
+    # id берутся из файла: после загрузки сдвигается последовательность.
+    explicit_ids = True
+    # Ключи всей таблицы читаются заранее; иначе - запросом на пакет,
+    # и память не зависит от размера таблицы.
+    preload_keys = True
+    # Для COPY: столбец таблицы -> SQL-выражение над столбцами CSV.
+    copy_columns = {}
+    # Импортёры таблиц, которые должны быть загружены раньше.
+    depends_on = ()
+    # Столбец CSV -> поле модели; по ним же работает выгрузка.
+    csv_columns = {}
+    # Столбцы csv_columns, которых может не быть в файле.
+    optional_columns = ()
+
+    def __init__(self, path=None, batch_size=BATCH_SIZE, directory=DATA_ROOT):
+        self.path = path or self.find(directory)
+        self.batch_size = batch_size
+
+    @classmethod
+    def find(cls, directory):
+        """Файл таблицы в directory: несжатый или, если его нет, .gz."""
+
+        path = os.path.join(directory, cls.filename)
+        if not os.path.exists(path) and os.path.exists(path + ".gz"):
+            return path + ".gz"
+        return path
+
+    def build(self, row):
+        """Объект модели из строки CSV."""
+
+        raise NotImplementedError
+
+    def key(self, obj):
+        return tuple(getattr(obj, field) for field in self.key_fields)
+
+    def existing_keys(self):
+        return set(
+            self.model.objects.values_list(*self.key_fields).iterator()
+        )
+
+    def existing_keys_for(self, objs):
+        """Существующие ключи среди ключей objs."""
+
+        field = self.key_fields[0]
+        values = list({getattr(obj, field) for obj in objs})
+        keys = set()
+        for chunk in batched(values, LOOKUP_SIZE):
+            keys.update(
+                self.model.objects.filter(**{f"{field}__in": chunk})
+                .values_list(*self.key_fields)
+                .iterator()
+            )
+        return keys
+
+    def known_ids(self):
+        return {
+            field: set(model.objects.values_list("pk", flat=True).iterator())
+            for field, model in self.references.items()
+        }
+
+    def check_header(self, header):
+        """Проверяет, что заголовок файла состоит из csv_columns."""
+
+        unknown = [
+            column for column in header if column not in self.csv_columns
+        ]
+        missing = [
+            column for column in self.csv_columns
+            if column not in header and column not in self.optional_columns
+        ]
+        if unknown or missing or len(set(header)) != len(header):
+            raise ValueError(
+                f"Некорректный заголовок {self.filename}: {header}, "
+                f"ожидаются столбцы {list(self.csv_columns)}"
+            )
+
+    def copy_expressions(self, header):
+        """copy_columns для файла с заголовком header."""
+
+        return self.copy_columns
+
+    def after_batch(self, objs):
+        """Вызывается в транзакции пакета после вставки."""
+
+    def after_copy(self):
+        """Вызывается в транзакции загрузки через COPY после вставки."""
+
+    def after_import(self, stats):
+        """Вызывается после загрузки всего файла."""
+
+    @property
+    def compressed(self):
+        return self.path.endswith(".gz")
+
+    def open(self):
+        if self.compressed:
+            return gzip.open(self.path, "rt", encoding="utf-8", newline="")
+        return open(self.path, encoding="utf-8", newline="")
+
+    def open_binary(self):
+        if self.path == STDIN:
+            return nullcontext(sys.stdin.buffer)
+        if self.compressed:
+            # Смещения считаются в распакованных байтах, seek их понимает.
+            return gzip.open(self.path, "rb")
+        return open(self.path, "rb")
+
+    def checkpoint(self, restart=False):
+        """Запись о загрузке файла; для стандартного ввода - None."""
+
+        if self.path == STDIN:
+            return None
+        checkpoint, created = ImportCheckpoint.objects.get_or_create(
+            table=self.model._meta.db_table,
+            checksum=file_checksum(self.path),
+        )
+        if restart and not created:
+            checkpoint.offset = 0
+            checkpoint.rows = 0
+            checkpoint.completed_at = None
+            checkpoint.save()
+        return checkpoint
+
+    def prepare(self, rows, existing, known, stats):
+        """Новые объекты из пакета строк."""
+
+        objs = []
+        for row in rows:
+            stats.rows += 1
+            if None in row.values():
+                # Столбцов меньше, чем в заголовке.
+                stats.invalid += 1
+                continue
+            try:
+                obj = self.build(row)
+            except (KeyError, TypeError, ValueError):
+                stats.invalid += 1
+                continue
+            if any(
+                getattr(obj, field) not in ids
+                for field, ids in known.items()
+            ):
+                stats.invalid += 1
+                continue
+            objs.append(obj)
+        if existing is None:
+            existing = self.existing_keys_for(objs)
+        new = []
+        for obj in objs:
+            key = self.key(obj)
+            if key in existing:
+                stats.skipped += 1
+                continue
+            existing.add(key)
+            new.append(obj)
+        return new
+
+    def insert(self, objs, stats):
+        """Вставляет пакет и возвращает вставленные объекты.
+        Если база отклонила пакет (например, слишком длинное значение),
+        строки вставляются по одной, отклонённые считаются ошибочными."""
+
+        try:
+            with transaction.atomic():
+                self.model.objects.bulk_create(objs, ignore_conflicts=True)
+        except DatabaseError:
+            objs = self.insert_one_by_one(objs, stats)
+        return self.inserted(objs, stats)
+
+    def insert_one_by_one(self, objs, stats):
+        accepted = []
+        for obj in objs:
+            try:
+                with transaction.atomic():
+                    self.model.objects.bulk_create(
+                        [obj],
+                        ignore_conflicts=True,
+                    )
+            except DatabaseError:
+                stats.invalid += 1
+            else:
+                accepted.append(obj)
+        return accepted
+
+    def inserted(self, objs, stats):
+        """Объекты, строки которых оказались в таблице.
+        ignore_conflicts молча отбрасывает строки, конфликтующие
+        по другим уникальным полям или с параллельной загрузкой,
+        такие строки считаются уже существовавшими."""
+
+        present = self.existing_keys_for(objs)
+        inserted = [obj for obj in objs if self.key(obj) in present]
+        stats.skipped += len(objs) - len(inserted)
+        return inserted
+
+    def run(self, checkpoint=False, restart=False):
+        stats = ImportStats(self.model._meta.db_table)
+        start = perf_counter()
+        progress = self.checkpoint(restart) if checkpoint else None
+        if progress is not None and progress.completed_at is not None:
+            stats.unchanged = True
+            return stats
+        offset = progress.offset if progress is not None else 0
+        existing = self.existing_keys() if self.preload_keys else None
+        known = self.known_ids()
+        with self.open_binary() as file:
+            stream = CSVStream(file, offset)
+            if offset and stream.offset == offset:
+                stats.resumed_from = offset
+            for rows in batched(stream, self.batch_size):
+                objs = self.prepare(rows, existing, known, stats)
+                with transaction.atomic():
+                    objs = self.insert(objs, stats)
+                    self.after_batch(objs)
+                    if progress is not None:
+                        progress.offset = stream.offset
+                        progress.rows += len(rows)
+                        progress.save(
+                            update_fields=("offset", "rows", "updated_at"),
+                        )
+                stats.created += len(objs)
+        if progress is not None:
+            progress.completed_at = timezone.now()
+            progress.save(update_fields=("completed_at", "updated_at"))
+        if self.explicit_ids:
+            reset_sequences(self.model)
+        stats.seconds = perf_counter() - start
+        self.after_import(stats)
+        return stats
+
+
+class TagImporter(CSVImporter):
+    model = Tag
+    filename = "tags.csv"
+    csv_columns = {
+        "id": "id",
+        "name": "name",
+        "color": "color",
+        "slug": "slug",
+    }
+    copy_columns = {
+        "id": "id::bigint",
+        "name": "name",
+        "color": "color",
+        "slug": "slug",
+    }
+
+    def build(self, row):
+        return Tag(
+            id=int(row["id"]),
+            name=row["name"],
+            color=row["color"],
+            slug=row["slug"],
+        )
+
+    def after_import(self, stats):
+        if stats.created:
+            bump_version(TAGS_VERSION)
+
+
+class IngredientImporter(CSVImporter):
+    model = Ingredient
+    filename = "ingredients.csv"
+    key_fields = ("name", "measurement_unit")
+    explicit_ids = False
+    # Каталоги поставщиков бывают на миллионы строк.
+    preload_keys = False
+    csv_columns = {
+        "name": "name",
+        "measurement_unit": "measurement_unit",
+    }
+    copy_columns = {
+        "name": "name",
+        "measurement_unit": "measurement_unit",
+    }
+
+    def build(self, row):
+        return Ingredient(
+            name=row["name"],
+            measurement_unit=row["measurement_unit"],
+        )
+
+    def after_import(self, stats):
+        if stats.created:
+            bump_version(INGREDIENTS_VERSION)
+
+
+class AuthorImporter(CSVImporter):
+    model = User
+    filename = "author.csv"
+    csv_columns = {
+        "id": "id",
+        "username": "username",
+        "email": "email",
+        "first_name": "first_name",
+        "last_name": "last_name",
+    }
+    copy_columns = {
+        "id": "id::bigint",
+        "username": "username",
+        "email": "email",
+        "first_name": "first_name",
+        "last_name": "last_name",
+        # Непригодный пароль, как make_password(None).
+        "password": "'!' || md5(random()::text)",
+        "is_superuser": "false",
+        "is_staff": "false",
+        "is_active": "true",
+        "date_joined": "now()",
+    }
+
+    def build(self, row):
+        return User(
+            id=int(row["id"]),
+            username=row["username"],
+            email=row["email"],
+            first_name=row["first_name"],
+            last_name=row["last_name"],
+            password=make_password(None),
+        )
+
+
+class RecipeImporter(CSVImporter):
+    model = Recipe
+    filename = "recipe.csv"
+    references = {"author_id": User}
+    depends_on = (AuthorImporter,)
+    csv_columns = {
+        "id": "id",
+        "author": "author_id",
+        "name": "name",
+        "image": "image",
+        "text": "text",
+        "cooking_time": "cooking_time",
+        # Необязательный столбец: в data/ его нет.
+        "pub_date": "pub_date",
+    }
+    optional_columns = ("pub_date",)
+    copy_columns = {
+        "id": "id::bigint",
+        "author_id": "author::bigint",
+        "name": "name",
+        "image": "image",
+        "text": "text",
+        "cooking_time": "cooking_time::integer",
+        # Без даты в файле у строк всё равно разные даты: каждая
+        # следующая строка на микросекунду позже предыдущей.
+        "pub_date": (
+            "now() - (max(_row) OVER () - _row) * interval '1 microsecond'"
+        ),
+        "updated_at": "now()",
+    }
+
+    def copy_expressions(self, header):
+        if "pub_date" not in header:
+            return self.copy_columns
+        return {
+            **self.copy_columns,
+            "pub_date": (
+                "COALESCE(NULLIF(pub_date, '')::timestamptz, "
+                f"{self.copy_columns['pub_date']})"
+            ),
+        }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Дата последней строки без даты в файле.
+        self.last_pub_date = None
+
+    def build(self, row):
+        recipe = Recipe(
+            id=int(row["id"]),
+            author_id=int(row["author"]),
+            name=row["name"],
+            image=row["image"],
+            text=row["text"],
+            cooking_time=int(row["cooking_time"]),
+        )
+        # auto_now_add заменит pub_date при вставке,
+        # дата из файла восстанавливается в after_batch.
+        recipe.file_pub_date = None
+        if row.get("pub_date"):
+            pub_date = parse_datetime(row["pub_date"])
+            if pub_date is None:
+                raise ValueError(f"Некорректная дата {row['pub_date']}")
+            if timezone.is_naive(pub_date):
+                pub_date = timezone.make_aware(pub_date)
+            recipe.file_pub_date = pub_date
+        return recipe
+
+    def after_batch(self, objs):
+        # Как и при COPY, у строк без даты разные даты: каждая
+        # следующая строка файла на микросекунду позже предыдущей.
+        step = timedelta(microseconds=1)
+        start = timezone.now() - step * len(objs)
+        if self.last_pub_date is not None:
+            start = max(start, self.last_pub_date + step)
+        for number, obj in enumerate(objs):
+            obj.pub_date = obj.file_pub_date or start + step * number
+        if objs:
+            self.last_pub_date = start + step * (len(objs) - 1)
+        Recipe.objects.bulk_update(objs, ("pub_date",), batch_size=500)
+        update_recipe_search(
+            Recipe.objects.filter(pk__in=[obj.pk for obj in objs])
+        )
+
+    def after_copy(self):
+        update_recipe_search(Recipe.objects.filter(search_vector__isnull=True))
+
+
+class RecipeIngredientImporter(CSVImporter):
+    model = RecipeIngredient
+    filename = "recipe_ingredients.csv"
+    key_fields = ("recipe_id", "ingredient_id")
+    explicit_ids = False
+    references = {"recipe_id": Recipe, "ingredient_id": Ingredient}
+    depends_on = (RecipeImporter, IngredientImporter)
+    csv_columns = {
+        "recipe_id": "recipe_id",
+        "ingredient_id": "ingredient_id",
+        "amount": "amount",
+    }
+    copy_columns = {
+        "recipe_id": "recipe_id::bigint",
+        "ingredient_id": "ingredient_id::bigint",
+        "amount": "amount::double precision",
+    }
+
+    def build(self, row):
+        return RecipeIngredient(
+            recipe_id=int(row["recipe_id"]),
+            ingredient_id=int(row["ingredient_id"]),
+            amount=float(row["amount"]),
+        )
+
+
+class RecipeTagImporter(CSVImporter):
+    model = Recipe.tags.through
+    filename = "recipe_tags.csv"
+    key_fields = ("recipe_id", "tag_id")
+    references = {"recipe_id": Recipe, "tag_id": Tag}
+    depends_on = (RecipeImporter, TagImporter)
+    csv_columns = {
+        "id": "id",
+        "tags_id": "tag_id",
+        "recipe_id": "recipe_id",
+    }
+    copy_columns = {
+        "id": "id::bigint",
+        "recipe_id": "recipe_id::bigint",
+        "tag_id": "tags_id::bigint",
+    }
+
+    def build(self, row):
+        return self.model(
+            id=int(row["id"]),
+            recipe_id=int(row["recipe_id"]),
+            tag_id=int(row["tags_id"]),
+        )
+
+
+class CopyLoader:
+    """Быстрая загрузка CSV в PostgreSQL.
+    Файл целиком передаётся через COPY FROM STDIN в нежурналируемую
+    промежуточную таблицу с текстовыми столбцами, затем одним
+    INSERT ... SELECT ... ON CONFLICT DO NOTHING переносится в таблицу
+    модели. Строки со ссылками на отсутствующие записи отбрасываются
+    условием IN. Всё выполняется в одной транзакции; порядок
+    строк файла сохраняется, поэтому автоматические id совпадают
+    с порядковыми номерами строк, как при загрузке через ORM."""
+
+    def __init__(self, importer):
+        self.importer = importer
+        self.quote = connection.ops.quote_name
+
+    def insert_sql(self, staging, header):
+        importer = self.importer
+        model = importer.model
+        columns = importer.copy_expressions(header)
+        conditions = [
+            f"{columns[field]} IN (SELECT {self.quote(ref._meta.pk.column)} "
+            f"FROM {self.quote(ref._meta.db_table)})"
+            for field, ref in importer.references.items()
+        ]
+        where = f"WHERE {' AND '.join(conditions)} " if conditions else ""
+        return (
+            f"INSERT INTO {self.quote(model._meta.db_table)} "
+            f"({', '.join(self.quote(column) for column in columns)}) "
+            f"SELECT {', '.join(columns.values())} FROM {staging} "
+            f"{where}ORDER BY _row ON CONFLICT DO NOTHING"
+        )
+
+    def run(self):
+        importer = self.importer
+        stats = ImportStats(importer.model._meta.db_table)
+        start = perf_counter()
+        staging = self.quote(f"import_{stats.table}")
+        with importer.open() as file:
+            header = next(csv.reader(file))
+            # Имена столбцов попадают в SQL.
+            importer.check_header(header)
+            file.seek(0)
+            columns = ", ".join(self.quote(column) for column in header)
+            text_columns = ", ".join(
+                f"{self.quote(column)} text" for column in header
+            )
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(f"DROP TABLE IF EXISTS {staging}")
+                cursor.execute(
+                    f"CREATE UNLOGGED TABLE {staging} "
+                    f"(_row bigserial, {text_columns})"
+                )
+                cursor.copy_expert(
+                    f"COPY {staging} ({columns}) "
+                    "FROM STDIN WITH (FORMAT csv, HEADER true)",
+                    file,
+                )
+                cursor.execute(f"SELECT count(*) FROM {staging}")
+                stats.rows = cursor.fetchone()[0]
+                cursor.execute(self.insert_sql(staging, header))
+                stats.created = cursor.rowcount
+                cursor.execute(f"DROP TABLE {staging}")
+                importer.after_copy()
+        # Без разделения: уже существующие строки и строки
+        # с отсутствующими ссылками.
+        stats.skipped = stats.rows - stats.created
+        if importer.explicit_ids:
+            reset_sequences(importer.model)
+        stats.seconds = perf_counter() - start
+        importer.after_import(stats)
+        return stats
+
+
+def load(importer, use_copy=None):
+    """Загружает файл импортёра: через COPY в PostgreSQL,
+    пакетами через ORM в остальных базах или при use_copy=False."""
+
+    if use_copy is None:
+        use_copy = connection.vendor == "postgresql"
+    if use_copy:
+        return CopyLoader(importer).run()
+    return importer.run()
+
+
+# Порядок загрузки: каждая таблица ссылается только на предыдущие.
+IMPORTERS = (
+    TagImporter,
+    IngredientImporter,
+    AuthorImporter,
+    RecipeImporter,
+    RecipeIngredientImporter,
+    RecipeTagImporter,
+)
+
+
+class Stage:
+    """Загрузка одной таблицы в load_all."""
+
+    def __init__(self, importer_class):
+        self.importer_class = importer_class
+        self.name = importer_class.model._meta.db_table
+        self.stats = None
+        self.error = None
+        # Имя этапа, из-за ошибки которого этот не запускался.
+        self.blocked_by = None
+        self.seconds = 0.0
+
+    @property
+    def ok(self):
+        return self.stats is not None
+
+    def run(self, batch_size, use_copy, directory, own_connection):
+        start = perf_counter()
+        try:
+            importer = self.importer_class(
+                batch_size=batch_size,
+                directory=directory,
+            )
+            self.stats = load(importer, use_copy)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.seconds = perf_counter() - start
+            if own_connection:
+                connections.close_all()
+        return self
+
+
+def load_all(
+    importer_classes=IMPORTERS,
+    batch_size=BATCH_SIZE,
+    use_copy=None,
+    workers=None,
+    directory=DATA_ROOT,
+):
+    """Загружает таблицы с учётом depends_on и выдаёт этапы
+    по мере завершения.
+    Этап запускается, когда загружены все таблицы, от которых он
+    зависит; независимые этапы выполняются параллельно в пуле потоков,
+    у каждого потока своё соединение с базой. SQLite допускает
+    одного пишущего, поэтому в ней по умолчанию этапы идут по очереди
+    в текущем потоке. Этапы, зависящие от неудачного, не запускаются."""
+
+    if workers is None:
+        workers = 1 if connection.vendor == "sqlite" else len(importer_classes)
+    executor = ThreadPoolExecutor(max_workers=workers) if workers > 1 else None
+    pending = [Stage(importer_class) for importer_class in importer_classes]
+    done = {}
+    running = {}
+    try:
+        while pending or running:
+            progress = False
+            for stage in list(pending):
+                upstream = [
+                    done.get(dependency)
+                    for dependency in stage.importer_class.depends_on
+                    if dependency in importer_classes
+                ]
+                if None in upstream:
+                    continue
+                pending.remove(stage)
+                progress = True
+                failed = next((up for up in upstream if not up.ok), None)
+                if failed is not None:
+                    stage.blocked_by = failed.name
+                elif executor is None:
+                    stage.run(
+                        batch_size,
+                        use_copy,
+                        directory,
+                        own_connection=False,
+                    )
+                else:
+                    future = executor.submit(
+                        stage.run,
+                        batch_size,
+                        use_copy,
+                        directory,
+                        own_connection=True,
+                    )
+                    running[future] = stage
+                    continue
+                done[stage.importer_class] = stage
+                yield stage
+            if running:
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    stage = running.pop(future)
+                    done[stage.importer_class] = stage
+                    yield stage
+            elif not progress:
+                names = ", ".join(stage.name for stage in pending)
+                raise ValueError(f"Циклические зависимости: {names}")
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+
+class ImportCommand(BaseCommand):
+    """Команда загрузки одной таблицы импортёром importer_class.
+    Ход загрузки файла сохраняется: повторный запуск после сбоя
+    продолжает с последнего сохранённого пакета."""
+
+    importer_class = None
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "path",
+            nargs="?",
+            help=f"CSV-файл, {STDIN} - стандартный ввод "
+                 "(без продолжения после сбоя). По умолчанию - файл из data/.",
+        )
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Загрузить файл с начала, даже если он уже загружался.",
+        )
+
+    def report(self, stats):
+        style = self.style.WARNING if stats.invalid else self.style.SUCCESS
+        self.stdout.write(style(str(stats)))
+
+    def handle(self, *args, **options):
+        importer = self.importer_class(
+            options["path"],
+            batch_size=options["batch_size"],
+        )
+        try:
+            stats = importer.run(checkpoint=True, restart=options["restart"])
+        except (OSError, csv.Error, DatabaseError, UnicodeDecodeError) as e:
+            raise CommandError(
+                f"Error importing {importer.path}: {e}. "
+                "Loaded batches are saved, run again to continue."
+            )
+        self.report(stats)
@@ -0,0 +1,77 @@
+import base64
+import math
+import os
+import tracemalloc
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand
+from PIL import Image
+from rest_framework.serializers import ImageField
+
+from api.fields import Base64ImageField
+
+MB = 1024 * 1024
+
+
+def noise_data_uri(size):
+    """PNG из шума размером около size байт в виде data URI."""
+
+    side = int(math.sqrt(size / 3))
+    image = Image.frombytes("RGB", (side, side), os.urandom(side * side * 3))
+    buffer = BytesIO()
+    image.save(buffer, "PNG", compress_level=1)
+    return "data:image/png;base64," + base64.b64encode(
+        buffer.getvalue()
+    ).decode()
+
+
+def decode_in_memory(data):
+    """Прежний способ: вся картинка декодируется в одну строку байт."""
+
+    header, imgstr = data.split(";base64,")
+    return ImageField().to_internal_value(
+        ContentFile(base64.b64decode(imgstr), name="temp.png")
+    )
+
+
+def decode_in_chunks(data):
+    return Base64ImageField().to_internal_value(data)
+
+
+class Command(BaseCommand):
+    help = "Пиковая память Python при декодировании картинки из base64"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "sizes",
+            nargs="*",
+            type=float,
+            default=(1, 5, 9),
+            help="Размеры картинок в мегабайтах.",
+        )
+
+    def peak(self, func, data):
+        """Пик выделенной памяти сверх уже занятой строкой data."""
+
+        tracemalloc.start()
+        try:
+            func(data).close()
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    def handle(self, *args, **options):
+        for size in options["sizes"]:
+            data = noise_data_uri(size * MB)
+            self.stdout.write(f"Картинка {size:g} МБ, base64 "
+                              f"{len(data) / MB:.1f} МБ:")
+            for name, func in (
+                ("целиком", decode_in_memory),
+                ("порциями", decode_in_chunks),
+            ):
+                peak = self.peak(func, data)
+                self.stdout.write(
+                    f"  {name:10} пик {peak / MB:7.2f} МБ "
+                    f"({peak / len(data):.2f} от строки base64)"
+                )
@@ -0,0 +1,84 @@
+import csv
+import os
+import random
+import tempfile
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from food.importers import IngredientImporter
+from food.models import Ingredient
+
+UNITS = ("г", "кг", "мл", "л", "шт.", "ст. л.", "ч. л.", "по вкусу")
+
+
+class Rollback(Exception):
+    """Откатывает загруженные при замерах строки."""
+
+
+def write_ingredients(path, rows):
+    with open(path, "w", encoding="utf-8", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(("name", "measurement_unit"))
+        for number in range(rows):
+            writer.writerow((f"ингредиент {number}", random.choice(UNITS)))
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает загрузку ингредиентов через get_or_create "
+        "и пакетную загрузку на синтетическом файле"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1_000_000)
+        parser.add_argument(
+            "--sample",
+            type=int,
+            default=10_000,
+            help="Сколько строк загрузить построчно: полный файл "
+                 "через get_or_create грузится слишком долго.",
+        )
+
+    def per_row(self, path, sample):
+        """Прежняя построчная загрузка первых sample строк."""
+
+        start = perf_counter()
+        with open(path, encoding="utf-8", newline="") as file:
+            for number, row in enumerate(csv.DictReader(file)):
+                if number == sample:
+                    break
+                Ingredient.objects.get_or_create(
+                    name=row["name"],
+                    measurement_unit=row["measurement_unit"],
+                )
+        return sample / (perf_counter() - start)
+
+    def handle(self, *args, **options):
+        random.seed(0)
+        descriptor, path = tempfile.mkstemp(suffix=".csv")
+        os.close(descriptor)
+        try:
+            write_ingredients(path, options["rows"])
+            try:
+                with transaction.atomic():
+                    per_row_rate = self.per_row(path, options["sample"])
+                    raise Rollback
+            except Rollback:
+                pass
+            try:
+                with transaction.atomic():
+                    stats = IngredientImporter(path).run()
+                    raise Rollback
+            except Rollback:
+                pass
+        finally:
+            os.unlink(path)
+        self.stdout.write(f"get_or_create: {per_row_rate:.0f} строк/с")
+        self.stdout.write(f"пакетами:      {stats}")
+        self.stdout.write(
+            f"ускорение: {stats.rate / per_row_rate:.1f}x, "
+            f"{options['rows']} строк по одной заняли бы "
+            f"{options['rows'] / per_row_rate:.0f} с"
+        )
@@ -0,0 +1,106 @@
+import random
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from food.cache import INGREDIENTS_VERSION, bump_version
+from food.models import Ingredient
+from food.search import (index_search, orm_search, rebuild_ingredient_index,
+                         trigram_search)
+
+DEFAULT_QUERIES = ("а", "мо", "сах", "масло", "сливочное масло")
+
+UNITS = ("г", "кг", "мл", "л", "шт.", "ст. л.", "ч. л.", "по вкусу")
+
+
+class Rollback(Exception):
+    """Откатывает синтетический каталог после замеров."""
+
+
+class Command(BaseCommand):
+    help = "Сравнивает время поиска ингредиентов разными способами"
+
+    def add_arguments(self, parser):
+        parser.add_argument("queries", nargs="*", default=DEFAULT_QUERIES)
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument(
+            "--synthetic",
+            type=int,
+            default=0,
+            help="Дополнить каталог N синтетическими ингредиентами "
+                 "на время замеров (изменения откатываются).",
+        )
+
+    def timeit(self, func, repeat):
+        """Среднее время вызова func в миллисекундах."""
+
+        start = perf_counter()
+        for _ in range(repeat):
+            func()
+        return (perf_counter() - start) * 1000 / repeat
+
+    def add_synthetic(self, count):
+        """Синтетические названия из слов настоящего каталога."""
+
+        words = sorted(
+            {
+                word
+                for name in Ingredient.objects.values_list("name", flat=True)
+                for word in name.split()
+            }
+        )
+        rnd = random.Random(count)
+        Ingredient.objects.bulk_create(
+            (
+                Ingredient(
+                    name=" ".join(rnd.sample(words, rnd.randint(1, 3)))
+                    + f" {number}",
+                    measurement_unit=rnd.choice(UNITS),
+                )
+                for number in range(count)
+            ),
+            batch_size=5000,
+        )
+        bump_version(INGREDIENTS_VERSION)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                if options["synthetic"]:
+                    self.add_synthetic(options["synthetic"])
+                self.run(options["queries"], options["repeat"])
+                raise Rollback
+        except Rollback:
+            bump_version(INGREDIENTS_VERSION)
+
+    def run(self, queries, repeat):
+        searches = {"ORM": orm_search, "индекс": index_search}
+        if connection.vendor == "postgresql":
+            searches["pg_trgm"] = trigram_search
+        start = perf_counter()
+        index = rebuild_ingredient_index()
+        self.stdout.write(
+            f"Каталог: {len(index)} ингредиентов, индекс построен за "
+            f"{(perf_counter() - start) * 1000:.1f} мс"
+        )
+        self.stdout.write(
+            f"{'запрос':<20}{'найдено':>10}"
+            + "".join(f"{name + ', мс':>14}" for name in searches)
+        )
+        # Все способы отдают первые settings.INGREDIENT_SEARCH_LIMIT
+        # строк; найдено - сколько всего названий содержат запрос.
+        queryset = Ingredient.objects.all()
+        for query in queries:
+            found = queryset.filter(name__icontains=query).count()
+            timings = (
+                self.timeit(
+                    lambda: list(search(queryset, query)),
+                    repeat,
+                )
+                for search in searches.values()
+            )
+            self.stdout.write(
+                f"{query:<20}{found:>10}"
+                + "".join(f"{ms:>14.2f}" for ms in timings)
+            )
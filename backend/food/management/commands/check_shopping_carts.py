@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from food.cart import (AMOUNT_EPSILON, live_cart_totals, rebuild_cart_totals,
+                       stored_cart_totals)
+
+
+class Command(BaseCommand):
+    help = ("Сверяет таблицу сумм списков покупок с пересчётом по рецептам "
+            "и пересобирает её")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Только показать расхождения, не пересобирать таблицу.",
+        )
+
+    def handle(self, *args, **options):
+        live = live_cart_totals()
+        stored = stored_cart_totals()
+        mismatches = 0
+        for key in sorted(live.keys() | stored.keys()):
+            expected = live.get(key, 0)
+            actual = stored.get(key, 0)
+            if abs(expected - actual) > AMOUNT_EPSILON:
+                mismatches += 1
+                user_id, ingredient_id = key
+                self.stdout.write(
+                    self.style.WARNING(
+                        f"user {user_id}, ingredient {ingredient_id}: "
+                        f"в таблице {actual}, по рецептам {expected}"
+                    )
+                )
+        self.stdout.write(
+            f"Проверено сумм: {len(live)}, расхождений: {mismatches}"
+        )
+        if options["dry_run"]:
+            return
+        rebuild_cart_totals()
+        self.stdout.write(self.style.SUCCESS("Таблица сумм пересобрана"))
@@ -0,0 +1,55 @@
+import os
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError
+
+from food.exporters import CHUNK_SIZE, EXPORTERS, AuthorExporter
+
+
+class Command(BaseCommand):
+    help = (
+        "Exports all data to CSV files in the data/ layout, "
+        "which import_all_csv --directory loads back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("directory", help="Каталог для файлов.")
+        parser.add_argument(
+            "--gzip",
+            action="store_true",
+            help="Сжимать файлы в .gz.",
+        )
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+        parser.add_argument(
+            "--include-staff",
+            action="store_true",
+            help="Выгружать сотрудников и суперпользователей без рецептов.",
+        )
+
+    def handle(self, *args, **options):
+        os.makedirs(options["directory"], exist_ok=True)
+        start = perf_counter()
+        rows = 0
+        for exporter_class in EXPORTERS:
+            extra = {}
+            if issubclass(exporter_class, AuthorExporter):
+                extra["include_staff"] = options["include_staff"]
+            exporter = exporter_class(
+                options["directory"],
+                compress=options["gzip"],
+                chunk_size=options["chunk_size"],
+                **extra,
+            )
+            try:
+                stats = exporter.run()
+            except (OSError, DatabaseError) as e:
+                raise CommandError(f"Error exporting {exporter.path}: {e}")
+            self.stdout.write(str(stats))
+            rows += stats.rows
+        seconds = perf_counter() - start
+        msg = (
+            f"All data exported successfully: {rows} rows "
+            f"in {seconds:.2f} s, {rows / seconds:.0f} rows/s"
+        )
+        self.stdout.write(self.style.SUCCESS(msg))
@@ -0,0 +1,347 @@
+import random
+from datetime import timedelta
+from io import BytesIO
+from itertools import count
+from math import gcd
+from time import perf_counter
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from PIL import Image
+
+from food.cache import INGREDIENTS_VERSION, TAGS_VERSION, bump_version
+from food.cart import rebuild_cart_totals
+from food.importers import BATCH_SIZE, reset_sequences
+from food.models import (Favourites, Ingredient, Recipe, RecipeIngredient,
+                         ShoppingList, Subscription, Tag)
+from food.search import update_recipe_search
+from food.storage import content_hash
+from food.utils import batched
+
+User = get_user_model()
+
+UNITS = ("г", "кг", "мл", "л", "шт.", "ст. л.", "ч. л.", "по вкусу")
+DISHES = (
+    "суп", "салат", "пирог", "каша", "рагу",
+    "запеканка", "омлет", "плов", "борщ", "блины",
+)
+WORDS = (
+    "нарежьте", "смешайте", "добавьте", "обжарьте", "варите", "посолите",
+    "подавайте", "горячим", "мелко", "минут", "до", "готовности", "муку",
+    "масло", "лук", "морковь", "сметану", "зелень", "тесто", "сковороде",
+)
+FIRST_NAMES = ("Анна", "Иван", "Мария", "Пётр", "Ольга", "Сергей")
+LAST_NAMES = ("Иванов", "Смирнов", "Кузнецов", "Попов", "Соколов")
+# Картинки-заглушки: столько разных файлов на все рецепты.
+FAKE_IMAGES = 8
+FAKE_IMAGE_SIZE = (640, 480)
+# Средний промежуток между публикациями рецептов, секунд.
+RECIPE_INTERVAL = 600
+RECIPE_FIELDS = (
+    "id",
+    "author",
+    "name",
+    "image",
+    "text",
+    "cooking_time",
+    "pub_date",
+    "updated_at",
+)
+# Наименьший шаг, которым популярные номера разносятся по диапазону.
+STRIDE = 7919
+# Пользователей на один пересчёт сумм списков покупок.
+CART_USERS_CHUNK = 1000
+# Параметров в одном INSERT, если база не сообщает свой предел:
+# больше 65535 не принимает протокол PostgreSQL.
+MAX_QUERY_PARAMS = 65535
+
+
+class Skewed:
+    """Случайные номера 0..n-1, номер k выпадает с вероятностью
+    около 1 / (k + 1) (закон Ципфа): немногие записи выбираются
+    очень часто. Номера умножаются на взаимно простой с n шаг,
+    чтобы популярные записи не шли подряд по id."""
+
+    def __init__(self, rng, n):
+        self.rng = rng
+        self.n = n
+        self.stride = next(s for s in count(STRIDE) if gcd(s, n) == 1)
+
+    def __call__(self):
+        rank = int((self.n + 1) ** self.rng.random()) - 1
+        return rank * self.stride % self.n
+
+    def sample(self, k, exclude=None):
+        """До k разных номеров, кроме exclude.
+        Попыток ограниченное число: редкие номера выпадают нечасто."""
+
+        picked = set()
+        for _ in range(k * 10):
+            if len(picked) == k:
+                break
+            number = self()
+            if number != exclude:
+                picked.add(number)
+        return picked
+
+
+def heavy_tail(rng, alpha, limit):
+    """Число по Парето: у большинства 0-2, у немногих - до limit."""
+
+    return min(limit, int(rng.paretovariate(alpha)) - 1)
+
+
+class Command(BaseCommand):
+    help = (
+        "Заполняет базу синтетическими пользователями, рецептами, "
+        "избранным, списками покупок и подписками для проверок "
+        "на больших объёмах"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=10_000)
+        parser.add_argument("--recipes", type=int, default=100_000)
+        parser.add_argument("--ingredients", type=int, default=2_000)
+        parser.add_argument("--tags", type=int, default=20)
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="С тем же seed на пустой базе получаются те же данные.",
+        )
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+
+    def first_id(self, model):
+        return (model.objects.aggregate(last=Max("pk"))["last"] or 0) + 1
+
+    def insert_rows(self, model, fields, rows):
+        """INSERT кортежей значений fields без объектов модели:
+        на миллионах строк bulk_create тратит большую часть времени
+        на создание объектов и сборку SQL."""
+
+        quote = connection.ops.quote_name
+        columns = ", ".join(
+            quote(model._meta.get_field(field).column) for field in fields
+        )
+        values = f"({', '.join(['%s'] * len(fields))})"
+        max_params = (
+            connection.features.max_query_params or MAX_QUERY_PARAMS
+        )
+        with connection.cursor() as cursor:
+            for chunk in batched(rows, max(1, max_params // len(fields))):
+                cursor.execute(
+                    f"INSERT INTO {quote(model._meta.db_table)} ({columns}) "
+                    f"VALUES {', '.join([values] * len(chunk))}",
+                    [value for row in chunk for value in row],
+                )
+
+    def insert(self, model, rows, fields=None, after_batch=None):
+        """Вставляет пакетами, каждый в своей транзакции,
+        объекты модели или, если заданы fields, кортежи их значений."""
+
+        start = perf_counter()
+        inserted = 0
+        for batch in batched(rows, self.batch_size):
+            with transaction.atomic():
+                if fields is None:
+                    model.objects.bulk_create(batch)
+                else:
+                    self.insert_rows(model, fields, batch)
+                if after_batch is not None:
+                    after_batch(batch)
+            inserted += len(batch)
+        seconds = perf_counter() - start
+        rate = inserted / seconds if seconds else 0.0
+        self.stdout.write(
+            f"{model._meta.db_table}: {inserted} строк; "
+            f"{seconds:.2f} с, {rate:.0f} строк/с"
+        )
+        self.rows += inserted
+
+    def tags(self):
+        for pk in self.ids[Tag]:
+            yield Tag(
+                id=pk,
+                name=f"тег {pk}",
+                color=f"#{self.rng.randrange(0x1000000):06x}",
+                slug=f"tag-{pk}",
+            )
+
+    def ingredients(self):
+        for pk in self.ids[Ingredient]:
+            yield Ingredient(
+                id=pk,
+                name=f"ингредиент {pk}",
+                measurement_unit=self.rng.choice(UNITS),
+            )
+
+    def users(self):
+        # Непригодный пароль: хешировать его для каждого незачем.
+        password = make_password(None)
+        for pk in self.ids[User]:
+            yield User(
+                id=pk,
+                username=f"user{pk}",
+                email=f"user{pk}@example.com",
+                first_name=self.rng.choice(FIRST_NAMES),
+                last_name=self.rng.choice(LAST_NAMES),
+                password=password,
+            )
+
+    def images(self):
+        """Сохраняет картинки-заглушки в хранилище рецептов
+        и возвращает их имена."""
+
+        field = Recipe._meta.get_field("image")
+        names = []
+        for _ in range(FAKE_IMAGES):
+            color = tuple(self.rng.randrange(256) for _ in range(3))
+            buffer = BytesIO()
+            Image.new("RGB", FAKE_IMAGE_SIZE, color).save(buffer, "JPEG")
+            content = ContentFile(buffer.getvalue())
+            name = f"{field.upload_to}{content_hash(content)}.jpg"
+            names.append(field.storage.save(name, content))
+        return names
+
+    def publication_dates(self, size):
+        """size дат публикации по возрастанию, последняя - сейчас.
+        Промежутки случайные, в среднем RECIPE_INTERVAL секунд,
+        и не короче микросекунды, поэтому даты не повторяются.
+        Шаги генерируются дважды из одного seed: для их суммы
+        и для самих дат, - чтобы не держать их в памяти."""
+
+        seed = self.rng.getrandbits(64)
+
+        def steps():
+            rng = random.Random(seed)
+            for _ in range(size):
+                seconds = rng.expovariate(1 / RECIPE_INTERVAL)
+                yield timedelta(microseconds=1 + int(seconds * 1_000_000))
+
+        moment = timezone.now() - sum(steps(), timedelta())
+        for step in steps():
+            moment += step
+            yield connection.ops.adapt_datetimefield_value(moment)
+
+    def recipes(self, authors):
+        users = self.ids[User]
+        images = self.images()
+        dates = self.publication_dates(len(self.ids[Recipe]))
+        for pk, pub_date in zip(self.ids[Recipe], dates):
+            yield (
+                pk,
+                users[authors()],
+                f"{self.rng.choice(DISHES)} {pk}",
+                self.rng.choice(images),
+                " ".join(self.rng.choices(WORDS, k=self.rng.randint(20, 80))),
+                self.rng.randint(5, 180),
+                pub_date,
+                pub_date,
+            )
+
+    def recipe_ingredients(self):
+        ingredients = self.ids[Ingredient]
+        # Соль и масло есть почти везде, экзотика - в единицах рецептов.
+        popular = Skewed(self.rng, len(ingredients))
+        for pk in self.ids[Recipe]:
+            for number in popular.sample(self.rng.randint(3, 12)):
+                yield pk, ingredients[number], self.rng.randint(1, 500)
+
+    def recipe_tags(self):
+        tags = self.ids[Tag]
+        for pk in self.ids[Recipe]:
+            k = min(len(tags), self.rng.randint(1, 3))
+            for tag_id in self.rng.sample(tags, k):
+                yield pk, tag_id
+
+    def per_user(self, targets, popular, alpha, limit):
+        """Пары (пользователь, запись targets, выбранная по popular);
+        число пар у пользователя - с тяжёлым хвостом.
+        Если targets - сами пользователи, пар с собой нет."""
+
+        for index, user_id in enumerate(self.ids[User]):
+            numbers = popular.sample(
+                heavy_tail(self.rng, alpha, limit),
+                exclude=index if targets is self.ids[User] else None,
+            )
+            for number in numbers:
+                yield user_id, targets[number]
+
+    def rebuild_carts(self):
+        start = perf_counter()
+        for user_ids in batched(self.ids[User], CART_USERS_CHUNK):
+            rebuild_cart_totals(user_ids)
+        self.stdout.write(
+            f"суммы списков покупок: {perf_counter() - start:.2f} с"
+        )
+
+    def handle(self, *args, **options):
+        sizes = {
+            Tag: options["tags"],
+            Ingredient: options["ingredients"],
+            User: options["users"],
+            Recipe: options["recipes"],
+        }
+        if min(sizes.values()) < 1:
+            raise CommandError("Все количества должны быть положительными")
+        self.rng = random.Random(options["seed"])
+        self.batch_size = options["batch_size"]
+        self.rows = 0
+        # Id задаются явно, продолжая существующие.
+        self.ids = {}
+        for model, size in sizes.items():
+            first = self.first_id(model)
+            self.ids[model] = range(first, first + size)
+        start = perf_counter()
+        # Немногие авторы пишут большую часть рецептов и собирают
+        # большую часть подписчиков.
+        authors = Skewed(self.rng, len(self.ids[User]))
+        recipes = Skewed(self.rng, len(self.ids[Recipe]))
+        self.insert(Tag, self.tags())
+        self.insert(Ingredient, self.ingredients())
+        self.insert(User, self.users())
+        self.insert(
+            Recipe,
+            self.recipes(authors),
+            fields=RECIPE_FIELDS,
+            after_batch=lambda batch: update_recipe_search(
+                Recipe.objects.filter(pk__range=(batch[0][0], batch[-1][0]))
+            ),
+        )
+        for model in sizes:
+            reset_sequences(model)
+        self.insert(
+            RecipeIngredient,
+            self.recipe_ingredients(),
+            fields=("recipe", "ingredient", "amount"),
+        )
+        self.insert(
+            Recipe.tags.through,
+            self.recipe_tags(),
+            fields=("recipe", "tag"),
+        )
+        for model, field, targets, popular, alpha, limit in (
+            (Favourites, "recipe", Recipe, recipes, 1.2, 500),
+            # Тяжёлый хвост: немногие держат в списке покупок десятки
+            # рецептов.
+            (ShoppingList, "recipe", Recipe, recipes, 1.5, 100),
+            (Subscription, "subscribed", User, authors, 1.3, 300),
+        ):
+            self.insert(
+                model,
+                self.per_user(self.ids[targets], popular, alpha, limit),
+                fields=("user", field),
+            )
+        self.rebuild_carts()
+        bump_version(TAGS_VERSION)
+        bump_version(INGREDIENTS_VERSION)
+        seconds = perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f"Создано {self.rows} строк за {seconds:.2f} с, "
+            f"{self.rows / seconds:.0f} строк/с"
+        ))
@@ -1,24 +1,67 @@
-from django.core.management.base import BaseCommand, CommandError
+from time import perf_counter
 
-from food.management.commands import (import_author_csv,
-                                      import_ingredients_csv,
-                                      import_recipe_csv,
-                                      import_recipe_ingredients_csv,
-                                      import_recipe_tags_csv, import_tags_csv)
+from django.core.management.base import CommandError
 
+from food.importers import (BATCH_SIZE, DATA_ROOT, IMPORTERS, ImportCommand,
+                            load_all)
 
-class Command(BaseCommand):
-    help = "Imports all data from CSV files"
+
+class Command(ImportCommand):
+    help = (
+        "Imports all data from CSV files. "
+        "Independent tables are loaded concurrently, "
+        "PostgreSQL tables are loaded with COPY."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+        parser.add_argument(
+            "--directory",
+            default=DATA_ROOT,
+            help="Каталог с CSV-файлами (можно сжатыми в .gz), "
+                 "например выгрузкой export_all_csv. По умолчанию data/.",
+        )
+        parser.add_argument(
+            "--orm",
+            action="store_true",
+            help="Загружать через ORM пакетами и в PostgreSQL.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            help="Сколько таблиц загружать одновременно. По умолчанию: "
+                 "все независимые, в SQLite - по одной.",
+        )
 
     def handle(self, *args, **options):
-        try:
-            import_tags_csv.Command().handle()
-            import_ingredients_csv.Command().handle()
-            import_author_csv.Command().handle()
-            import_recipe_csv.Command().handle()
-            import_recipe_ingredients_csv.Command().handle()
-            import_recipe_tags_csv.Command().handle()
-            msg = "All data imported successfully"
-            self.stdout.write(self.style.SUCCESS(msg))
-        except Exception as e:
-            raise CommandError(f"Error importing data: {e}")
+        start = perf_counter()
+        failed = []
+        stages = load_all(
+            IMPORTERS,
+            batch_size=options["batch_size"],
+            use_copy=False if options["orm"] else None,
+            workers=options["workers"],
+            directory=options["directory"],
+        )
+        for stage in stages:
+            if stage.ok:
+                self.report(stage.stats)
+                continue
+            failed.append(stage.name)
+            if stage.blocked_by:
+                self.stderr.write(
+                    f"{stage.name}: skipped, {stage.blocked_by} failed"
+                )
+            else:
+                self.stderr.write(self.style.ERROR(
+                    f"{stage.name}: error after {stage.seconds:.2f} s: "
+                    f"{stage.error}"
+                ))
+        seconds = perf_counter() - start
+        if failed:
+            raise CommandError(
+                f"Error importing data: {', '.join(failed)} "
+                f"not imported ({seconds:.2f} s)"
+            )
+        msg = f"All data imported successfully in {seconds:.2f} s"
+        self.stdout.write(self.style.SUCCESS(msg))
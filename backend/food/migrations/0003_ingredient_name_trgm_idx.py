@@ -0,0 +1,35 @@
+from django.db import migrations
+
+INDEX_NAME = "ingredient_name_trgm_idx"
+
+
+def create_trigram_index(apps, schema_editor):
+    """GIN-индекс pg_trgm для поиска ингредиентов по вхождению.
+    Индексируется то же выражение UPPER(name::text), которое Django
+    строит для lookup-ов icontains и istartswith.
+    На других СУБД миграция ничего не делает."""
+
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    schema_editor.execute(
+        f"CREATE INDEX IF NOT EXISTS {INDEX_NAME} ON food_ingredient "
+        "USING gin (UPPER(name::text) gin_trgm_ops)"
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(f"DROP INDEX IF EXISTS {INDEX_NAME}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('food', '0002_recipe_pub_date_id_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 3.2.16 on 2026-10-18 19:20
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+INDEX_NAME = "recipe_search_vector_idx"
+FTS_TABLE = "food_recipe_fts"
+
+
+def create_search_index(apps, schema_editor):
+    """PostgreSQL: GIN-индекс по search_vector и заполнение векторов.
+    SQLite: FTS5-таблица с названием и описанием рецептов."""
+
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {INDEX_NAME} ON food_recipe "
+            "USING gin (search_vector)"
+        )
+        schema_editor.execute(
+            "UPDATE food_recipe SET search_vector = "
+            "setweight(to_tsvector('russian', name), 'A') || "
+            "setweight(to_tsvector('russian', text), 'B')"
+        )
+    elif vendor == "sqlite":
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+            "USING fts5(name, text, tokenize = 'unicode61')"
+        )
+        schema_editor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, name, text) "
+            "SELECT id, name, text FROM food_recipe"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.execute(f"DROP INDEX IF EXISTS {INDEX_NAME}")
+    elif vendor == "sqlite":
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('food', '0003_ingredient_name_trgm_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Поисковый вектор'),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 3.2.16 on 2026-10-18 19:27
+
+from django.db import migrations, models
+
+
+def fill_updated_at(apps, schema_editor):
+    """Существующие рецепты считаются изменёнными в момент публикации."""
+
+    Recipe = apps.get_model("food", "Recipe")
+    Recipe.objects.update(updated_at=models.F("pub_date"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("food", "0005_shoppingcartingredient"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True,
+                verbose_name="Дата и время изменения",
+            ),
+        ),
+        migrations.RunPython(fill_updated_at, migrations.RunPython.noop),
+    ]
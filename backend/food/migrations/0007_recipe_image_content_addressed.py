@@ -0,0 +1,24 @@
+# Generated by Django 3.2.16 on 2026-10-18 19:39
+
+from django.db import migrations
+
+import food.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("food", "0006_recipe_updated_at"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="recipe",
+            name="image",
+            field=food.storage.ContentAddressedImageField(
+                db_index=True,
+                upload_to="images/",
+                verbose_name="Картинка, закодированная в Base64",
+            ),
+        ),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 3.2.16 on 2026-10-18 19:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("food", "0007_recipe_image_content_addressed"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ImportCheckpoint",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "table",
+                    models.CharField(max_length=200, verbose_name="Таблица"),
+                ),
+                (
+                    "checksum",
+                    models.CharField(
+                        max_length=64,
+                        verbose_name="SHA-256 файла",
+                    ),
+                ),
+                (
+                    "offset",
+                    models.BigIntegerField(
+                        default=0,
+                        verbose_name="Загружено байт",
+                    ),
+                ),
+                (
+                    "rows",
+                    models.BigIntegerField(
+                        default=0,
+                        verbose_name="Обработано строк",
+                    ),
+                ),
+                (
+                    "completed_at",
+                    models.DateTimeField(
+                        blank=True,
+                        null=True,
+                        verbose_name="Завершена",
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(
+                        auto_now=True,
+                        verbose_name="Обновлена",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Загрузка файла",
+                "verbose_name_plural": "Загрузки файлов",
+                "ordering": ("-updated_at",),
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="importcheckpoint",
+            constraint=models.UniqueConstraint(
+                fields=("table", "checksum"),
+                name="unique_import_checkpoint",
+            ),
+        ),
+    ]
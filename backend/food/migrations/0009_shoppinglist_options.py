@@ -0,0 +1,22 @@
+# Generated by Django 3.2.16 on 2026-10-18 20:17
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("food", "0008_importcheckpoint"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="shoppinglist",
+            options={
+                "default_related_name": "shopping_list",
+                "ordering": ("user",),
+                "verbose_name": "Покупка",
+                "verbose_name_plural": "Покупки",
+            },
+        ),
+    ]
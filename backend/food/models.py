@@ -1,15 +1,84 @@
 from django.contrib.auth import get_user_model
-from django.core.exceptions import ValidationError
+from django.contrib.postgres.search import SearchVectorField
+from django.core.exceptions import EmptyResultSet, ValidationError
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import connection, models
+from django.db.models.functions import RowNumber
+from django.utils import timezone
 
 from food.constants import (COLOR_CODE_MAX_LENGTH, FIELD_MAX_AMOUNT,
                             FIELD_MAX_TIME, FIELD_MIN_AMOUNT, FIELD_MIN_TIME,
                             NAME_MAX_LENGTH, SLAG_LEN, UNIT_MAX_LENGTH)
+from food.storage import ContentAddressedImageField
 
 User = get_user_model()
 
 
+class RecipeQuerySet(models.QuerySet):
+    """Набор рецептов с пользовательскими флагами."""
+
+    def with_user_flags(self, user):
+        """Добавляет is_favorited и is_in_shopping_cart подзапросами EXISTS.
+        Для анонимного пользователя оба флага - константа False."""
+
+        if user is None or user.is_anonymous:
+            return self.annotate(
+                is_favorited=models.Value(
+                    False, output_field=models.BooleanField()
+                ),
+                is_in_shopping_cart=models.Value(
+                    False, output_field=models.BooleanField()
+                ),
+            )
+        return self.annotate(
+            is_favorited=models.Exists(
+                Favourites.objects.filter(
+                    user=user,
+                    recipe=models.OuterRef("pk"),
+                )
+            ),
+            is_in_shopping_cart=models.Exists(
+                ShoppingList.objects.filter(
+                    user=user,
+                    recipe=models.OuterRef("pk"),
+                )
+            ),
+        )
+
+    def touch(self):
+        """Отмечает рецепты изменёнными: обновляет updated_at."""
+
+        return self.update(updated_at=timezone.now())
+
+    def latest_for_authors(self, authors, limit=None):
+        """Последние рецепты каждого из авторов одним запросом.
+        Рецепты нумеруются оконной функцией
+        ROW_NUMBER() OVER (PARTITION BY author ORDER BY pub_date DESC),
+        и от каждого автора остаются первые limit штук."""
+
+        recipes = self.filter(author__in=authors)
+        if limit is None:
+            return recipes
+        ranked = recipes.annotate(
+            row_number=models.Window(
+                expression=RowNumber(),
+                partition_by=[models.F("author")],
+                order_by=models.F("pub_date").desc(),
+            )
+        )
+        try:
+            sql, params = ranked.query.sql_with_params()
+        except EmptyResultSet:
+            # Пустая страница авторов: запрос заведомо ничего не вернёт.
+            return self.none()
+        row_number = connection.ops.quote_name("row_number")
+        return self.raw(
+            f"SELECT * FROM ({sql}) ranked "
+            f"WHERE {row_number} <= %s ORDER BY {row_number}",
+            (*params, limit),
+        )
+
+
 class Tag(models.Model):
     """Цветовой код, например, #49B64E."""
 
@@ -36,6 +105,39 @@ class Tag(models.Model):
         return f"{self.name}"
 
 
+class IngredientQuerySet(models.QuerySet):
+    """Набор ингредиентов, который может быть упорядочен списком id."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._id_order = None
+
+    def in_order(self, ids):
+        """Ингредиенты с id из ids в том же порядке.
+        База сортировку не выполняет: выбранные объекты
+        упорядочиваются в Python."""
+
+        queryset = self.filter(id__in=ids).order_by()
+        queryset._id_order = list(ids)
+        return queryset
+
+    def _clone(self):
+        queryset = super()._clone()
+        queryset._id_order = self._id_order
+        return queryset
+
+    def _fetch_all(self):
+        fetched = self._result_cache is None
+        super()._fetch_all()
+        if (
+            fetched
+            and self._id_order is not None
+            and self._iterable_class is models.query.ModelIterable
+        ):
+            positions = {pk: n for n, pk in enumerate(self._id_order)}
+            self._result_cache.sort(key=lambda item: positions[item.pk])
+
+
 class Ingredient(models.Model):
     """Все поля обязательны для заполнения."""
 
@@ -48,6 +150,8 @@ class Ingredient(models.Model):
         max_length=UNIT_MAX_LENGTH,
     )
 
+    objects = IngredientQuerySet.as_manager()
+
     class Meta:
 
         ordering = ("name",)
@@ -76,9 +180,10 @@ class Recipe(models.Model):
         "Название",
         max_length=NAME_MAX_LENGTH,
     )
-    image = models.ImageField(
+    image = ContentAddressedImageField(
         upload_to="images/",
         verbose_name="Картинка, закодированная в Base64",
+        db_index=True,
     )
     text = models.TextField("Описание")
     ingredients = models.ManyToManyField(
@@ -108,12 +213,29 @@ class Recipe(models.Model):
         "Дата и время публикации",
         auto_now_add=True,
     )
+    updated_at = models.DateTimeField(
+        "Дата и время изменения",
+        auto_now=True,
+    )
+    search_vector = SearchVectorField(
+        "Поисковый вектор",
+        null=True,
+        editable=False,
+    )
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         default_related_name = "pecipes"
         ordering = ("-pub_date",)
         verbose_name = "Рецепт"
         verbose_name_plural = "Рецепты"
+        indexes = (
+            models.Index(
+                fields=("-pub_date", "-id"),
+                name="recipe_pub_date_id_idx",
+            ),
+        )
         constraints = (
             models.UniqueConstraint(
                 fields=("name", "author"),
@@ -200,6 +322,40 @@ class ShoppingList(models.Model):
         return f"{self.recipe}"
 
 
+class ShoppingCartIngredient(models.Model):
+    """Сумма ингредиента по всем рецептам в списке покупок пользователя.
+    Пересчитывается инкрементально при изменении списка покупок
+    и ингредиентов рецептов (food.cart)."""
+
+    user = models.ForeignKey(
+        User,
+        related_name="cart_ingredients",
+        verbose_name="Пользователь",
+        on_delete=models.CASCADE,
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        related_name="cart_ingredients",
+        verbose_name="Ингредиент",
+        on_delete=models.CASCADE,
+    )
+    amount = models.FloatField("Количество")
+
+    class Meta:
+        ordering = ("user",)
+        verbose_name = "Ингредиент списка покупок"
+        verbose_name_plural = "Ингредиенты списка покупок"
+        constraints = (
+            models.UniqueConstraint(
+                fields=("user", "ingredient"),
+                name="unique_user_ingredient_cart",
+            ),
+        )
+
+    def __str__(self):
+        return f"{self.ingredient} {self.amount}"
+
+
 class Subscription(models.Model):
     """ПОДПИСКИ"""
 
@@ -263,3 +419,47 @@ class Favourites(models.Model):
 
     def __str__(self):
         return f"{self.recipe.name}"
+
+
+class ImportCheckpoint(models.Model):
+    """Ход загрузки CSV-файла в таблицу.
+    Файл определяется содержимым (sha256), а не путём: прерванная
+    загрузка продолжается с offset, завершённая не повторяется."""
+
+    table = models.CharField("Таблица", max_length=NAME_MAX_LENGTH)
+    checksum = models.CharField("SHA-256 файла", max_length=64)
+    offset = models.BigIntegerField("Загружено байт", default=0)
+    rows = models.BigIntegerField("Обработано строк", default=0)
+    completed_at = models.DateTimeField("Завершена", null=True, blank=True)
+    updated_at = models.DateTimeField("Обновлена", auto_now=True)
+
+    class Meta:
+        verbose_name = "Загрузка файла"
+        verbose_name_plural = "Загрузки файлов"
+        ordering = ("-updated_at",)
+        constraints = (
+            models.UniqueConstraint(
+                fields=("table", "checksum"),
+                name="unique_import_checkpoint",
+            ),
+        )
+
+    def __str__(self):
+        return f"{self.table} {self.checksum[:12]}"
+
+
+class CacheVersion(models.Model):
+    """Версия справочника, копии которого процессы держат в памяти.
+    Меняется вместе с данными, процессы сверяют с ней свои копии."""
+
+    name = models.CharField("Справочник", max_length=50, unique=True)
+    # Случайная метка, а не счётчик: номер не повторится после отката
+    # транзакции или очистки таблицы.
+    version = models.CharField("Версия", max_length=32)
+
+    class Meta:
+        verbose_name = "Версия справочника"
+        verbose_name_plural = "Версии справочников"
+
+    def __str__(self):
+        return f"{self.name} {self.version}"
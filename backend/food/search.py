@@ -0,0 +1,311 @@
+import threading
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVector)
+from django.db import connections
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Collate, Lower
+
+from food.cache import INGREDIENTS_VERSION, get_version
+from food.constants import RECIPE_FTS_TABLE, SEARCH_CONFIG
+from food.models import Ingredient, Recipe
+
+NGRAM_SIZE = 3
+
+
+def ngrams(text, size=NGRAM_SIZE):
+    """Все подстроки text длиной от 1 до size символов."""
+
+    return {
+        text[start:start + length]
+        for length in range(1, size + 1)
+        for start in range(len(text) - length + 1)
+    }
+
+
+class IngredientIndex:
+    """Поисковый индекс ингредиентов в памяти процесса.
+
+    Названия в нижнем регистре лежат в отсортированном списке:
+    совпадения по началу названия - это непрерывный диапазон,
+    который находится двоичным поиском. Для поиска по вхождению
+    хранятся списки позиций (posting list) для всех n-грамм
+    длиной до NGRAM_SIZE символов."""
+
+    def __init__(self, rows, version=None):
+        rows = sorted((name.lower(), pk) for pk, name in rows)
+        self.version = version
+        self.names = [name for name, _ in rows]
+        self.ids = array("q", (pk for _, pk in rows))
+        postings = defaultdict(list)
+        for position, name in enumerate(self.names):
+            for gram in ngrams(name):
+                postings[gram].append(position)
+        self.postings = {
+            gram: array("I", positions)
+            for gram, positions in postings.items()
+        }
+
+    def __len__(self):
+        return len(self.names)
+
+    def prefix_range(self, query):
+        """Диапазон позиций названий, начинающихся с query."""
+
+        start = bisect_left(self.names, query)
+        end = bisect_left(self.names, query + "\uffff", start)
+        return start, end
+
+    def substring_positions(self, query):
+        """Позиции названий, содержащих query, по возрастанию."""
+
+        if len(query) <= NGRAM_SIZE:
+            return self.postings.get(query, ())
+        grams = sorted(
+            {
+                query[start:start + NGRAM_SIZE]
+                for start in range(len(query) - NGRAM_SIZE + 1)
+            },
+            key=lambda gram: len(self.postings.get(gram, ())),
+        )
+        candidates = set(self.postings.get(grams[0], ()))
+        for gram in grams[1:]:
+            if not candidates:
+                break
+            candidates.intersection_update(self.postings.get(gram, ()))
+        return sorted(
+            position
+            for position in candidates
+            if query in self.names[position]
+        )
+
+    def search(self, query, limit):
+        """Возвращает до limit id: сначала совпадения по началу
+        названия, затем остальные совпадения по вхождению,
+        каждые по алфавиту."""
+
+        query = query.lower()
+        start, end = self.prefix_range(query)
+        ids = self.ids[start:min(end, start + limit)].tolist()
+        if len(ids) < limit:
+            for position in self.substring_positions(query):
+                if start <= position < end:
+                    continue
+                ids.append(self.ids[position])
+                if len(ids) == limit:
+                    break
+        return ids
+
+
+_ingredient_index = None
+_ingredient_index_lock = threading.Lock()
+_ingredient_index_building = False
+
+
+def rebuild_ingredient_index():
+    """Строит индекс ингредиентов и делает его текущим для процесса.
+    Версия читается до строк: если каталог изменится во время
+    построения, индекс будет построен ещё раз."""
+
+    global _ingredient_index
+    version = get_version(INGREDIENTS_VERSION)
+    _ingredient_index = IngredientIndex(
+        Ingredient.objects.values_list("id", "name").iterator(),
+        version,
+    )
+    return _ingredient_index
+
+
+def _rebuild_in_background():
+    global _ingredient_index_building
+    try:
+        rebuild_ingredient_index()
+    finally:
+        # У потока своё соединение с базой.
+        connections.close_all()
+        with _ingredient_index_lock:
+            _ingredient_index_building = False
+
+
+def get_ingredient_index():
+    """Индекс ингредиентов текущего процесса или None, если индекса
+    ещё нет или каталог с тех пор изменился. Тогда индекс
+    перестраивается в фоновом потоке: на 100 тысячах ингредиентов
+    это секунды, и запрос их не ждёт."""
+
+    global _ingredient_index_building
+    version = get_version(INGREDIENTS_VERSION)
+    index = _ingredient_index
+    if index is not None and index.version == version:
+        return index
+    with _ingredient_index_lock:
+        if not _ingredient_index_building:
+            _ingredient_index_building = True
+            threading.Thread(
+                target=_rebuild_in_background,
+                name="ingredient-index",
+                daemon=True,
+            ).start()
+    return None
+
+
+def index_search(queryset, value):
+    """Поиск по индексу в памяти: из базы выбираются только первые
+    settings.INGREDIENT_SEARCH_LIMIT найденных строк, совпадения
+    по началу названия идут первыми. Пока индекс строится,
+    ищет запрос ORM."""
+
+    index = get_ingredient_index()
+    if index is None:
+        return orm_search(queryset, value)
+    return queryset.in_order(
+        index.search(value, settings.INGREDIENT_SEARCH_LIMIT)
+    )
+
+
+def name_order(queryset):
+    """Порядок названий, как в индексе в памяти: по кодам символов
+    названия в нижнем регистре. В PostgreSQL для этого нужно правило
+    сортировки "C", в SQLite оно по умолчанию."""
+
+    name = Lower("name")
+    if connections[queryset.db].vendor == "postgresql":
+        name = Collate(name, "C")
+    return name
+
+
+def orm_search(queryset, value):
+    """Поиск через ORM с тем же результатом, что у индекса в памяти:
+    первые settings.INGREDIENT_SEARCH_LIMIT строк, сначала совпадения
+    по началу названия, затем по вхождению, каждые по алфавиту.
+    Ограничение - подзапросом, к результату можно добавлять фильтры."""
+
+    ranked = (
+        queryset.filter(name__icontains=value)
+        .annotate(
+            search_rank=Case(
+                When(name__istartswith=value, then=Value(0)),
+                default=Value(1),
+                output_field=IntegerField(),
+            )
+        )
+        .order_by("search_rank", name_order(queryset), "pk")
+    )
+    return ranked.filter(
+        pk__in=ranked.values("pk")[:settings.INGREDIENT_SEARCH_LIMIT]
+    )
+
+
+def trigram_search(queryset, value):
+    """Поиск на PostgreSQL по GIN-индексу pg_trgm: запрос тот же,
+    что у orm_search, icontains (ILIKE) выполняется по индексу."""
+
+    return orm_search(queryset, value)
+
+
+def search_ingredients(queryset, value):
+    """Поиск ингредиентов способом из settings.INGREDIENT_SEARCH:
+    index - индекс в памяти процесса,
+    trigram - индекс pg_trgm (вне PostgreSQL - обычный запрос ORM)."""
+
+    if settings.INGREDIENT_SEARCH == "trigram":
+        if connections[queryset.db].vendor == "postgresql":
+            return trigram_search(queryset, value)
+        return orm_search(queryset, value)
+    return index_search(queryset, value)
+
+
+def update_recipe_search(recipes):
+    """Обновляет поисковый индекс для queryset рецептов.
+    PostgreSQL: tsvector в поле search_vector (название важнее описания),
+    SQLite: строки FTS5-таблицы RECIPE_FTS_TABLE с rowid = id рецепта."""
+
+    connection = connections[recipes.db]
+    if connection.vendor == "postgresql":
+        recipes.update(
+            search_vector=SearchVector(
+                "name",
+                weight="A",
+                config=SEARCH_CONFIG,
+            )
+            + SearchVector("text", weight="B", config=SEARCH_CONFIG)
+        )
+    elif connection.vendor == "sqlite":
+        rows = list(recipes.values_list("id", "name", "text"))
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"DELETE FROM {RECIPE_FTS_TABLE} WHERE rowid = %s",
+                [(pk,) for pk, _, _ in rows],
+            )
+            cursor.executemany(
+                f"INSERT INTO {RECIPE_FTS_TABLE} (rowid, name, text) "
+                "VALUES (%s, %s, %s)",
+                rows,
+            )
+
+
+def delete_recipe_search(recipe_id, using="default"):
+    """Удаляет рецепт из FTS5-таблицы SQLite."""
+
+    connection = connections[using]
+    if connection.vendor == "sqlite":
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {RECIPE_FTS_TABLE} WHERE rowid = %s",
+                [recipe_id],
+            )
+
+
+def fts5_query(value):
+    """Запрос FTS5 из слов value: все слова обязательны,
+    каждое ищется по началу, чтобы находились другие словоформы."""
+
+    words = (word.replace('"', "") for word in value.split())
+    return " ".join(f'"{word}"*' for word in words if word)
+
+
+def search_recipes(queryset, value):
+    """Полнотекстовый поиск по названию и описанию рецепта,
+    результаты упорядочены по релевантности."""
+
+    vendor = connections[queryset.db].vendor
+    if vendor == "postgresql":
+        query = SearchQuery(
+            value,
+            config=SEARCH_CONFIG,
+            search_type="websearch",
+        )
+        return (
+            queryset.filter(search_vector=query)
+            .annotate(search_rank=SearchRank(F("search_vector"), query))
+            .order_by("-search_rank", *Recipe._meta.ordering)
+        )
+    if vendor == "sqlite":
+        match = fts5_query(value)
+        if not match:
+            return queryset
+        recipe_id = f"{Recipe._meta.db_table}.id"
+        return (
+            queryset.filter(
+                id__in=RawSQL(
+                    f"SELECT rowid FROM {RECIPE_FTS_TABLE} "
+                    f"WHERE {RECIPE_FTS_TABLE} MATCH %s",
+                    (match,),
+                )
+            )
+            .annotate(
+                search_rank=RawSQL(
+                    f"SELECT bm25({RECIPE_FTS_TABLE}) FROM {RECIPE_FTS_TABLE} "
+                    f"WHERE {RECIPE_FTS_TABLE} MATCH %s "
+                    f"AND rowid = {recipe_id}",
+                    (match,),
+                )
+            )
+            .order_by("search_rank", *Recipe._meta.ordering)
+        )
+    return queryset.filter(Q(name__icontains=value) | Q(text__icontains=value))
@@ -0,0 +1,174 @@
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from food.cache import INGREDIENTS_VERSION, TAGS_VERSION, bump_version
+from food.cart import (add_ingredients_to_carts, add_recipe_to_cart,
+                       remove_recipe_from_cart)
+from food.images import release_image
+from food.models import (Ingredient, Recipe, RecipeIngredient, ShoppingList,
+                         Tag, User)
+from food.search import delete_recipe_search
+from jobs.queue import enqueue
+
+# Поля автора, которые попадают в выдачу рецепта.
+AUTHOR_FIELDS = frozenset(("email", "username", "first_name", "last_name"))
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def ingredient_changed(sender, **kwargs):
+    """Сбрасывает поисковый индекс ингредиентов."""
+
+    bump_version(INGREDIENTS_VERSION)
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(pre_delete, sender=Ingredient)
+def ingredient_touch_recipes(sender, instance, **kwargs):
+    """Рецепты с ингредиентом изменились вместе с ним."""
+
+    Recipe.objects.filter(ingredients=instance).touch()
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def tag_changed(sender, **kwargs):
+    """Сбрасывает кеш тегов."""
+
+    bump_version(TAGS_VERSION)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(pre_delete, sender=Tag)
+def tag_touch_recipes(sender, instance, **kwargs):
+    """Рецепты с тегом изменились вместе с ним."""
+
+    Recipe.objects.filter(tags=instance).touch()
+
+
+@receiver(post_save, sender=User)
+def author_touch_recipes(sender, instance, created, update_fields, **kwargs):
+    """Рецепты автора изменились вместе с его профилем.
+    Сохранения, не затрагивающие выдаваемые поля (last_login, пароль),
+    рецепты не трогают."""
+
+    if created:
+        return
+    if update_fields is not None and not AUTHOR_FIELDS & set(update_fields):
+        return
+    Recipe.objects.filter(author=instance).touch()
+
+
+@receiver(pre_save, sender=Recipe)
+def recipe_saving(sender, instance, **kwargs):
+    """Запоминает прежнюю картинку рецепта."""
+
+    instance._previous_image = None
+    if instance.pk is not None:
+        instance._previous_image = (
+            Recipe.objects.filter(pk=instance.pk)
+            .values_list("image", flat=True)
+            .first()
+        )
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, **kwargs):
+    """Ставит задачи создания уменьшенных копий картинки
+    и удаления прежней."""
+
+    image = instance.image
+    previous = instance._previous_image
+    if image and image.name != previous:
+        enqueue(
+            "food.make_renditions",
+            {"name": image.name},
+            key=f"renditions:{image.name}",
+        )
+    if previous and previous != image.name:
+        release_image(previous)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, using, **kwargs):
+    """Убирает удалённый рецепт из полнотекстового индекса
+    и освобождает его картинку."""
+
+    delete_recipe_search(instance.pk, using)
+    release_image(instance.image.name)
+
+
+# Суммы списков покупок (ShoppingCartIngredient) меняются сигналами
+# ShoppingList и RecipeIngredient, поэтому верны при любом изменении:
+# из API, из админки или из кода. bulk_create и update() сигналов
+# не посылают - вызывающий код меняет суммы сам.
+# При удалении рецепта каскадом удаляются обе таблицы; суммы вычитаются
+# после удаления строк: что удалено второй таблицей, уже не найдёт
+# ни ингредиентов, ни списков удалённой первой и не вычтется дважды.
+
+
+@receiver(pre_save, sender=ShoppingList)
+def cart_recipe_saving(sender, instance, **kwargs):
+    """Запоминает прежних пользователя и рецепт записи."""
+
+    instance._previous_cart_recipe = None
+    if instance.pk is not None:
+        instance._previous_cart_recipe = (
+            ShoppingList.objects.filter(pk=instance.pk)
+            .values_list("user_id", "recipe_id")
+            .first()
+        )
+
+
+@receiver(post_save, sender=ShoppingList)
+def cart_recipe_saved(sender, instance, **kwargs):
+    """Вычитает прежний рецепт из сумм и прибавляет новый."""
+
+    previous = instance._previous_cart_recipe
+    current = (instance.user_id, instance.recipe_id)
+    if previous == current:
+        return
+    if previous is not None:
+        remove_recipe_from_cart(*previous)
+    add_recipe_to_cart(*current)
+
+
+@receiver(post_delete, sender=ShoppingList)
+def cart_recipe_deleted(sender, instance, **kwargs):
+    remove_recipe_from_cart(instance.user_id, instance.recipe_id)
+
+
+@receiver(pre_save, sender=RecipeIngredient)
+def recipe_ingredient_saving(sender, instance, **kwargs):
+    """Запоминает прежние рецепт, ингредиент и количество."""
+
+    instance._previous_amount = None
+    if instance.pk is not None:
+        instance._previous_amount = (
+            RecipeIngredient.objects.filter(pk=instance.pk)
+            .values_list("recipe_id", "ingredient_id", "amount")
+            .first()
+        )
+
+
+@receiver(post_save, sender=RecipeIngredient)
+def recipe_ingredient_saved(sender, instance, **kwargs):
+    """Меняет суммы списков покупок, где лежит рецепт."""
+
+    previous = instance._previous_amount
+    if previous is not None:
+        recipe_id, ingredient_id, amount = previous
+        add_ingredients_to_carts(recipe_id, {ingredient_id: -amount})
+    add_ingredients_to_carts(
+        instance.recipe_id,
+        {instance.ingredient_id: instance.amount},
+    )
+
+
+@receiver(post_delete, sender=RecipeIngredient)
+def recipe_ingredient_deleted(sender, instance, **kwargs):
+    add_ingredients_to_carts(
+        instance.recipe_id,
+        {instance.ingredient_id: -instance.amount},
+    )
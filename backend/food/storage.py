@@ -0,0 +1,77 @@
+import hashlib
+import os
+from uuid import uuid4
+
+from django.core.files.storage import FileSystemStorage
+from django.db import models
+from django.db.models.fields.files import ImageFieldFile
+
+HASH_CHUNK_SIZE = 64 * 1024
+
+
+def content_hash(content):
+    """sha256 содержимого файла, прочитанного порциями."""
+
+    digest = hashlib.sha256()
+    content.seek(0)
+    for chunk in content.chunks(HASH_CHUNK_SIZE):
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Хранилище, в котором имя файла определяется содержимым.
+    Файл с уже занятым именем не перезаписывается и не получает
+    суффикс: одинаковое содержимое хранится один раз, а содержимое
+    файла по имени никогда не меняется.
+    Файл пишется во временный и появляется под своим именем жёсткой
+    ссылкой: недописанный файл не виден, а одновременное сохранение
+    того же содержимого не конфликтует."""
+
+    def get_available_name(self, name, max_length=None):
+        return name
+
+    def _save(self, name, content):
+        path = self.path(name)
+        if self.exists(name):
+            # Время изменения - время последнего сохранения:
+            # по нему отложенное удаление видит, что файл снова нужен.
+            os.utime(path)
+            return name
+        temporary = self.path(
+            super()._save(f"{name}.{uuid4().hex}.tmp", content)
+        )
+        try:
+            os.link(temporary, path)
+        except FileExistsError:
+            # Тот же файл успел сохранить другой процесс,
+            # содержимое по построению одинаковое.
+            os.utime(path)
+        finally:
+            os.remove(temporary)
+        return name
+
+
+class ContentAddressedFieldFile(ImageFieldFile):
+    def save(self, name, content, save=True):
+        _, extension = os.path.splitext(name)
+        super().save(content_hash(content) + extension.lower(), content, save)
+
+
+class ContentAddressedImageField(models.ImageField):
+    """ImageField, сохраняющий картинки под именем sha256 содержимого."""
+
+    attr_class = ContentAddressedFieldFile
+
+    def __init__(self, *args, **kwargs):
+        kwargs["storage"] = content_storage
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        del kwargs["storage"]
+        return name, path, args, kwargs
+
+
+content_storage = ContentAddressedStorage()
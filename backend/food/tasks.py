@@ -0,0 +1,23 @@
+from food.images import delete_unused_image, make_renditions
+from food.models import Recipe
+from jobs.queue import task
+
+
+@task("food.make_renditions")
+def make_renditions_task(name):
+    """Уменьшенные копии картинки рецепта по имени файла.
+    Рецепты с картинкой отмечаются изменёнными: их закешированные
+    представления со ссылкой на оригинал перестраиваются."""
+
+    field = Recipe._meta.get_field("image")
+    created = make_renditions(field.attr_class(None, field, name))
+    if created:
+        Recipe.objects.filter(image=name).touch()
+    return {"created": created}
+
+
+@task("food.release_image", max_attempts=1)
+def release_image_task(name):
+    """Удаляет картинку, на которую больше не ссылаются рецепты."""
+
+    return {"deleted": delete_unused_image(name)}
@@ -0,0 +1,9 @@
+from itertools import islice
+
+
+def batched(iterable, size):
+    """Списки по size элементов iterable, последний - короче."""
+
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
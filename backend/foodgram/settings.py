@@ -27,6 +27,7 @@ INSTALLED_APPS = [
     "api.apps.ApiConfig",
     "food.apps.FoodConfig",
     "users.apps.UsersConfig",
+    "jobs.apps.JobsConfig",
 ]
 
 MIDDLEWARE = [
@@ -114,10 +115,53 @@ STATIC_ROOT = BASE_DIR / "static"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
+# Кеш сгенерированных файлов списка покупок.
+SHOPPING_LIST_CACHE_DIR = os.getenv(
+    "SHOPPING_LIST_CACHE_DIR",
+    os.path.join(BASE_DIR, "cache", "shopping_lists"),
+)
+SHOPPING_LIST_CACHE_MAX_SIZE = int(
+    os.getenv("SHOPPING_LIST_CACHE_MAX_SIZE", 100 * 1024 * 1024)
+)
+# TrueType-шрифт с кириллицей для PDF списка покупок.
+SHOPPING_LIST_FONT = os.getenv(
+    "SHOPPING_LIST_FONT",
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+)
+
 AUTH_USER_MODEL = "users.CustomUser"
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# Версии справочников (теги, ингредиенты) перечитываются из базы
+# не чаще раза в столько секунд.
+CACHE_VERSION_TTL = float(os.getenv("CACHE_VERSION_TTL", 5))
+
+# Поиск ингредиентов: index - индекс в памяти процесса,
+# trigram - GIN-индекс pg_trgm (только PostgreSQL).
+INGREDIENT_SEARCH = os.getenv("INGREDIENT_SEARCH", "index")
+# Сколько ингредиентов отдаёт поиск по индексу в памяти.
+INGREDIENT_SEARCH_LIMIT = int(os.getenv("INGREDIENT_SEARCH_LIMIT", 50))
+
+# Фоновые задачи (jobs): при JOBS_EAGER задачи выполняются сразу
+# в процессе, поставившем их в очередь, без run_workers.
+JOBS_EAGER = os.getenv("JOBS_EAGER", "False") == "True"
+# Задержка перед повтором, секунд; удваивается с каждой попыткой.
+JOBS_RETRY_DELAY = int(os.getenv("JOBS_RETRY_DELAY", 10))
+# Воркер отмечает выполняемую задачу раз в столько секунд.
+JOBS_HEARTBEAT = int(os.getenv("JOBS_HEARTBEAT", 60))
+# Задача без отметки дольше этого считается потерянной
+# (воркер упал) и ставится заново.
+JOBS_TIMEOUT = int(os.getenv("JOBS_TIMEOUT", 600))
+# Картинка, на которую перестали ссылаться рецепты, удаляется
+# не раньше, чем через столько секунд.
+IMAGE_RELEASE_DELAY = int(os.getenv("IMAGE_RELEASE_DELAY", 3600))
+
+# Число рецептов в кеше готовых представлений (на процесс).
+RECIPE_FRAGMENT_CACHE_SIZE = int(
+    os.getenv("RECIPE_FRAGMENT_CACHE_SIZE", 2000)
+)
+
 DJOSER = {
     "LOGIN_FIELD": "email",
     "SEND_ACTIVATION_EMAIL": False,
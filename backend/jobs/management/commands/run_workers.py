@@ -0,0 +1,65 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from jobs.queue import pending_job_ids, requeue_stale, run_job
+
+
+def run_in_thread(job_id):
+    close_old_connections()
+    try:
+        return run_job(job_id)
+    finally:
+        close_old_connections()
+
+
+class Command(BaseCommand):
+    help = (
+        "Выполняет фоновые задачи из очереди в пуле потоков. "
+        "Для нескольких процессов запустите команду несколько раз: "
+        "задачи забираются атомарно."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=2)
+        parser.add_argument(
+            "--poll",
+            type=float,
+            default=1.0,
+            help="Пауза между опросами пустой очереди, секунд.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Выполнить накопившиеся задачи и завершиться.",
+        )
+
+    def handle(self, *args, **options):
+        workers = options["workers"]
+        running = {}
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            try:
+                while True:
+                    requeue_stale()
+                    for job_id in pending_job_ids(workers - len(running)):
+                        future = executor.submit(run_in_thread, job_id)
+                        running[future] = job_id
+                    if not running:
+                        if options["once"]:
+                            break
+                        time.sleep(options["poll"])
+                        continue
+                    done, _ = wait(
+                        running,
+                        timeout=options["poll"],
+                        return_when=FIRST_COMPLETED,
+                    )
+                    for future in done:
+                        job_id = running.pop(future)
+                        status = future.result()
+                        if status is not None:
+                            self.stdout.write(f"Задача {job_id}: {status}")
+            except KeyboardInterrupt:
+                self.stdout.write("Остановка после текущих задач")
@@ -0,0 +1,23 @@
+# Generated by Django 3.2.16 on 2026-10-18 20:35
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='heartbeat_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, help_text='Воркер обновляет её, пока выполняет задачу', verbose_name='Отметка воркера'),
+        ),
+        migrations.AddConstraint(
+            model_name='job',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ('pending', 'running')), models.Q(('key', ''), _negated=True)), fields=('key',), name='job_unique_unfinished_key'),
+        ),
+    ]
@@ -0,0 +1,83 @@
+from django.contrib.auth import get_user_model
+from django.db import models
+from django.utils import timezone
+
+User = get_user_model()
+
+
+class Job(models.Model):
+    """Фоновая задача в очереди на базе данных.
+    Задачи выполняет команда run_workers; неудачные попытки
+    повторяются с растущей задержкой до max_attempts раз."""
+
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = (
+        (PENDING, "В очереди"),
+        (RUNNING, "Выполняется"),
+        (DONE, "Выполнена"),
+        (FAILED, "Ошибка"),
+    )
+
+    name = models.CharField("Задача", max_length=100)
+    payload = models.JSONField("Аргументы", default=dict)
+    key = models.CharField(
+        "Ключ",
+        max_length=200,
+        blank=True,
+        help_text="Пока задача с ключом не завершена, новая не ставится",
+    )
+    user = models.ForeignKey(
+        User,
+        related_name="jobs",
+        verbose_name="Пользователь",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+    )
+    status = models.CharField(
+        "Статус",
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=PENDING,
+    )
+    attempts = models.PositiveIntegerField("Попытки", default=0)
+    max_attempts = models.PositiveIntegerField("Максимум попыток", default=3)
+    run_after = models.DateTimeField("Выполнить после", default=timezone.now)
+    result = models.JSONField("Результат", null=True, blank=True)
+    error = models.TextField("Ошибка", blank=True)
+    created_at = models.DateTimeField("Создана", auto_now_add=True)
+    started_at = models.DateTimeField("Начата", null=True, blank=True)
+    heartbeat_at = models.DateTimeField(
+        "Отметка воркера",
+        default=timezone.now,
+        help_text="Воркер обновляет её, пока выполняет задачу",
+    )
+    finished_at = models.DateTimeField("Завершена", null=True, blank=True)
+
+    class Meta:
+        ordering = ("-created_at",)
+        verbose_name = "Фоновая задача"
+        verbose_name_plural = "Фоновые задачи"
+        indexes = (
+            models.Index(
+                fields=("status", "run_after"),
+                name="job_status_run_after_idx",
+            ),
+            models.Index(fields=("key", "status"), name="job_key_status_idx"),
+        )
+        constraints = (
+            models.UniqueConstraint(
+                fields=("key",),
+                condition=(
+                    models.Q(status__in=("pending", "running"))
+                    & ~models.Q(key="")
+                ),
+                name="job_unique_unfinished_key",
+            ),
+        )
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
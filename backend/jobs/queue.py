@@ -0,0 +1,197 @@
+import threading
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from jobs.models import Job
+
+# Зарегистрированные задачи: {name: (функция, максимум попыток)}.
+TASKS = {}
+
+
+def task(name, max_attempts=3):
+    """Регистрирует функцию как фоновую задачу name.
+    Аргументы задачи передаются именованными и должны сериализоваться
+    в JSON, как и возвращаемое значение."""
+
+    def decorator(func):
+        TASKS[name] = (func, max_attempts)
+        return func
+
+    return decorator
+
+
+def enqueue(name, payload=None, user=None, key="", delay=0):
+    """Ставит задачу name с аргументами payload в очередь и возвращает Job.
+    Пока задача с тем же непустым key не завершена, новая не ставится.
+    Задача видна воркерам только после фиксации текущей транзакции
+    и выполняется не раньше, чем через delay секунд; отложенные задачи
+    и при JOBS_EAGER ждут воркера."""
+
+    if name not in TASKS:
+        raise ValueError(f"Задача {name} не зарегистрирована")
+    while True:
+        job = unfinished_job(key) if key else None
+        if job is not None:
+            return job
+        try:
+            # Между проверкой и вставкой задачу с тем же ключом может
+            # поставить другая транзакция: уникальное ограничение
+            # не даст вставить вторую, и найдена будет её задача.
+            with transaction.atomic():
+                job = Job.objects.create(
+                    name=name,
+                    payload=payload or {},
+                    key=key,
+                    user=user,
+                    max_attempts=TASKS[name][1],
+                    run_after=timezone.now() + timedelta(seconds=delay),
+                )
+            break
+        except IntegrityError:
+            continue
+    if settings.JOBS_EAGER and not delay:
+        transaction.on_commit(lambda: run_eagerly(job.pk))
+    return job
+
+
+def unfinished_job(key):
+    return Job.objects.filter(
+        key=key,
+        status__in=(Job.PENDING, Job.RUNNING),
+    ).first()
+
+
+def pending_job_ids(limit):
+    """Id задач, которые пора выполнять, в порядке очереди."""
+
+    return list(
+        Job.objects.filter(status=Job.PENDING, run_after__lte=timezone.now())
+        .order_by("run_after", "id")
+        .values_list("id", flat=True)[:limit]
+    )
+
+
+def claim(job_id):
+    """Атомарно забирает задачу; False, если её уже взял другой воркер.
+    Условное UPDATE работает одинаково в любой базе и между процессами."""
+
+    now = timezone.now()
+    return Job.objects.filter(pk=job_id, status=Job.PENDING).update(
+        status=Job.RUNNING,
+        attempts=F("attempts") + 1,
+        started_at=now,
+        heartbeat_at=now,
+    ) == 1
+
+
+def touch_job(job_id):
+    Job.objects.filter(pk=job_id, status=Job.RUNNING).update(
+        heartbeat_at=timezone.now()
+    )
+
+
+class Heartbeat:
+    """Пока задача выполняется, раз в JOBS_HEARTBEAT секунд
+    обновляет её отметку из отдельного потока: по отметке
+    requeue_stale отличает долгую задачу от задачи упавшего воркера."""
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(
+            target=self.run,
+            name=f"job-heartbeat-{job_id}",
+            daemon=True,
+        )
+
+    def run(self):
+        try:
+            while not self.stopped.wait(settings.JOBS_HEARTBEAT):
+                touch_job(self.job_id)
+        finally:
+            # У потока своё соединение с базой.
+            connections.close_all()
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stopped.set()
+        self.thread.join()
+
+
+def run_job(job_id):
+    """Выполняет задачу, если удалось её забрать.
+    Возвращает новый статус задачи или None."""
+
+    if not claim(job_id):
+        return None
+    job = Job.objects.get(pk=job_id)
+    func, _ = TASKS.get(job.name, (None, None))
+    try:
+        if func is None:
+            raise LookupError(f"Задача {job.name} не зарегистрирована")
+        with Heartbeat(job_id):
+            result = func(**job.payload)
+    except Exception:
+        return fail(job, traceback.format_exc())
+    Job.objects.filter(pk=job.pk).update(
+        status=Job.DONE,
+        result=result,
+        error="",
+        finished_at=timezone.now(),
+    )
+    return Job.DONE
+
+
+def fail(job, error):
+    """Неудачная попытка: повтор с удвоением задержки
+    или окончательная ошибка после max_attempts попыток."""
+
+    now = timezone.now()
+    if job.attempts < job.max_attempts:
+        delay = settings.JOBS_RETRY_DELAY * 2 ** (job.attempts - 1)
+        Job.objects.filter(pk=job.pk).update(
+            status=Job.PENDING,
+            error=error,
+            run_after=now + timedelta(seconds=delay),
+        )
+        return Job.PENDING
+    Job.objects.filter(pk=job.pk).update(
+        status=Job.FAILED,
+        error=error,
+        finished_at=now,
+    )
+    return Job.FAILED
+
+
+def run_eagerly(job_id):
+    """Выполняет задачу сразу, повторы - без задержки."""
+
+    while run_job(job_id) == Job.PENDING:
+        Job.objects.filter(pk=job_id).update(run_after=timezone.now())
+
+
+def requeue_stale():
+    """Возвращает в очередь задачи упавших воркеров: те, чья отметка
+    не обновлялась дольше JOBS_TIMEOUT секунд. Задачи живых воркеров
+    не трогаются, сколько бы они ни выполнялись."""
+
+    stale = Job.objects.filter(
+        status=Job.RUNNING,
+        heartbeat_at__lt=timezone.now() - timedelta(
+            seconds=settings.JOBS_TIMEOUT
+        ),
+    )
+    stale.filter(attempts__gte=F("max_attempts")).update(
+        status=Job.FAILED,
+        error="Превышено время выполнения",
+        finished_at=timezone.now(),
+    )
+    stale.update(status=Job.PENDING, run_after=timezone.now())
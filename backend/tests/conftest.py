@@ -0,0 +1,62 @@
+import pytest
+from rest_framework.test import APIClient
+
+# Модели импортируются в фикстурах: conftest загружается
+# до настройки приложений Django.
+
+
+@pytest.fixture(autouse=True)
+def cache_versions(monkeypatch):
+    """Версии справочников не переживают тест: база откатывается."""
+
+    from food import cache
+
+    monkeypatch.setattr(cache, "_versions", {})
+
+
+@pytest.fixture(autouse=True)
+def rendition_state(monkeypatch):
+    """Готовые копии картинок и поставленные задачи - заново в тесте."""
+
+    from food import images
+
+    monkeypatch.setattr(images, "_ready_renditions", set())
+    monkeypatch.setattr(images, "_requested_renditions", set())
+
+
+@pytest.fixture
+def author(django_user_model):
+    return django_user_model.objects.create_user(
+        username="author",
+        email="author@example.com",
+        password="password",
+        first_name="Иван",
+        last_name="Иванов",
+    )
+
+
+@pytest.fixture
+def client():
+    return APIClient()
+
+
+@pytest.fixture
+def make_recipes(author):
+    """Создаёт count рецептов автора author."""
+
+    from food.models import Recipe
+
+    def make(count, **fields):
+        return Recipe.objects.bulk_create(
+            Recipe(
+                author=author,
+                name=f"рецепт {number}",
+                text="описание",
+                cooking_time=10,
+                image="images/recipe.png",
+                **fields,
+            )
+            for number in range(count)
+        )
+
+    return make
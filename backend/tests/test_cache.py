@@ -0,0 +1,57 @@
+import pytest
+
+from food.cache import TAGS_VERSION, bump_version, get_version, tag_cache
+from food.models import CacheVersion, Tag
+
+pytestmark = pytest.mark.django_db
+
+
+def test_tag_cache_follows_version_in_database():
+    tag_cache.all()
+    # Так тег появляется для процесса, который его не создавал:
+    # строка и новая версия приходят из базы.
+    Tag.objects.bulk_create([Tag(name="ужин", color="#000000", slug="dinner")])
+    tag = Tag.objects.get(slug="dinner")
+    assert tag_cache.get(tag.pk) is None
+
+    bump_version(TAGS_VERSION)
+
+    assert tag_cache.get(tag.pk) == tag
+    assert ("dinner", "ужин") in tag_cache.slug_choices()
+
+
+def test_tag_save_changes_stored_version():
+    before = get_version(TAGS_VERSION)
+
+    Tag.objects.create(name="обед", color="#ffffff", slug="lunch")
+
+    assert CacheVersion.objects.get(name=TAGS_VERSION).version != before
+
+
+def test_version_is_read_once_per_ttl(settings, django_assert_num_queries):
+    settings.CACHE_VERSION_TTL = 60
+    Tag.objects.create(name="обед", color="#ffffff", slug="lunch")
+    tag = Tag.objects.get(slug="lunch")
+    tag_cache.all()
+
+    with django_assert_num_queries(0):
+        for _ in range(3):
+            assert tag_cache.get(tag.pk) == tag
+            tag_cache.all()
+
+
+def test_other_process_change_is_seen_after_ttl(settings):
+    settings.CACHE_VERSION_TTL = 60
+    tag_cache.all()
+    # Другой процесс меняет версию в базе.
+    Tag.objects.bulk_create([Tag(name="ужин", color="#000000", slug="dinner")])
+    CacheVersion.objects.update_or_create(
+        name=TAGS_VERSION,
+        defaults={"version": "other"},
+    )
+    tag = Tag.objects.get(slug="dinner")
+    assert tag_cache.get(tag.pk) is None
+
+    settings.CACHE_VERSION_TTL = 0
+
+    assert tag_cache.get(tag.pk) == tag
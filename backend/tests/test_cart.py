@@ -0,0 +1,138 @@
+import pytest
+
+from food import cart
+from food.cart import change_cart_totals, live_cart_totals, stored_cart_totals
+from food.models import (Ingredient, Recipe, RecipeIngredient,
+                         ShoppingCartIngredient, ShoppingList, Tag)
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def ingredients():
+    Ingredient.objects.bulk_create(
+        Ingredient(name=name, measurement_unit="г")
+        for name in ("мука", "соль")
+    )
+    return list(Ingredient.objects.values_list("pk", flat=True))
+
+
+def totals(user):
+    return dict(
+        ShoppingCartIngredient.objects.filter(user=user).values_list(
+            "ingredient_id",
+            "amount",
+        )
+    )
+
+
+def test_totals_are_added_and_removed(author, ingredients):
+    flour, salt = ingredients
+
+    change_cart_totals((author.pk,), {flour: 100, salt: 5})
+    change_cart_totals((author.pk,), {flour: 50, salt: -5})
+
+    assert totals(author) == {flour: 150}
+
+
+def test_row_inserted_concurrently_is_updated(author, ingredients,
+                                              monkeypatch):
+    flour, _ = ingredients
+    ShoppingCartIngredient.objects.create(
+        user=author,
+        ingredient_id=flour,
+        amount=100,
+    )
+    locked = cart.locked_cart_items
+    calls = []
+
+    def locked_before_other_insert(user_ids, deltas):
+        """Первая попытка не видит строку, вставленную другой
+        транзакцией после блокировки."""
+
+        calls.append(user_ids)
+        return {} if len(calls) == 1 else locked(user_ids, deltas)
+
+    monkeypatch.setattr(cart, "locked_cart_items", locked_before_other_insert)
+
+    change_cart_totals((author.pk,), {flour: 50})
+
+    assert len(calls) == 2
+    assert totals(author) == {flour: 150}
+
+
+@pytest.fixture
+def recipe(author, ingredients, make_recipes):
+    make_recipes(1)
+    recipe = Recipe.objects.get()
+    recipe.tags.add(Tag.objects.create(
+        name="обед",
+        color="#000000",
+        slug="lunch",
+    ))
+    RecipeIngredient.objects.create(
+        recipe=recipe,
+        ingredient_id=ingredients[0],
+        amount=100,
+    )
+    return recipe
+
+
+def test_admin_changes_keep_cart_totals(admin_client, author, recipe,
+                                        ingredients):
+    flour, salt = ingredients
+    response = admin_client.post(
+        "/admin/food/shoppinglist/add/",
+        {"user": author.pk, "recipe": recipe.pk},
+    )
+    assert response.status_code == 302
+    assert totals(author) == {flour: 100}
+
+    row = RecipeIngredient.objects.get(recipe=recipe)
+    response = admin_client.post(
+        f"/admin/food/recipe/{recipe.pk}/change/",
+        {
+            "author": author.pk,
+            "name": recipe.name,
+            "text": recipe.text,
+            "cooking_time": recipe.cooking_time,
+            "tags": list(recipe.tags.values_list("pk", flat=True)),
+            "recipe_ingredient-TOTAL_FORMS": 2,
+            "recipe_ingredient-INITIAL_FORMS": 1,
+            "recipe_ingredient-0-id": row.pk,
+            "recipe_ingredient-0-recipe": recipe.pk,
+            "recipe_ingredient-0-ingredient": flour,
+            "recipe_ingredient-0-amount": 300,
+            "recipe_ingredient-1-recipe": recipe.pk,
+            "recipe_ingredient-1-ingredient": salt,
+            "recipe_ingredient-1-amount": 5,
+        },
+    )
+    assert response.status_code == 302
+    assert totals(author) == {flour: 300, salt: 5}
+    assert stored_cart_totals() == live_cart_totals()
+
+    item = ShoppingList.objects.get()
+    response = admin_client.post(
+        f"/admin/food/shoppinglist/{item.pk}/delete/",
+        {"post": "yes"},
+    )
+    assert response.status_code == 302
+    assert totals(author) == {}
+
+
+def test_deleted_recipe_is_subtracted_once(author, recipe, ingredients,
+                                           django_user_model):
+    reader = django_user_model.objects.create_user(
+        username="reader",
+        email="reader@example.com",
+        password="password",
+    )
+    for user in (author, reader):
+        ShoppingList.objects.create(user=user, recipe=recipe)
+    change_cart_totals((author.pk,), {ingredients[1]: 7})
+
+    recipe.delete()
+
+    assert totals(author) == {ingredients[1]: 7}
+    assert totals(reader) == {}
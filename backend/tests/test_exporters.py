@@ -0,0 +1,59 @@
+import csv
+
+import pytest
+from django.core.management import call_command
+
+from food.exporters import AuthorExporter
+from food.importers import AuthorImporter
+from food.models import Recipe
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def users(django_user_model, author, make_recipes):
+    def create(username, **fields):
+        return django_user_model.objects.create_user(
+            username=username,
+            email=f"{username}@example.com",
+            password="password",
+            **fields,
+        ).pk
+
+    make_recipes(1)
+    staff_author = create("editor", is_staff=True)
+    Recipe.objects.create(
+        author_id=staff_author,
+        name="рецепт редактора",
+        text="описание",
+        cooking_time=10,
+        image="images/recipe.png",
+    )
+    return {
+        "author": author.pk,
+        "staff_author": staff_author,
+        "staff": create("moderator", is_staff=True),
+        "admin": create("admin", is_staff=True, is_superuser=True),
+    }
+
+
+def exported(path):
+    with open(path, encoding="utf-8", newline="") as file:
+        rows = list(csv.reader(file))
+    return rows[0], {int(row[0]) for row in rows[1:]}
+
+
+def test_staff_without_recipes_is_not_exported(users, tmp_path):
+    header, ids = exported(AuthorExporter(str(tmp_path)).run().path)
+
+    assert header == list(AuthorImporter.csv_columns)
+    assert "password" not in header
+    assert ids == {users["author"], users["staff_author"]}
+
+
+def test_include_staff_exports_everyone(users, tmp_path):
+    call_command("export_all_csv", str(tmp_path), "--include-staff")
+
+    _, ids = exported(tmp_path / AuthorImporter.filename)
+
+    assert ids == set(users.values())
@@ -0,0 +1,106 @@
+import os
+from io import BytesIO
+
+import pytest
+from django.conf import settings
+from pypdf import PdfReader
+
+from api import views
+from api.exports import export_digest, render_pdf
+from api.pdf import LINES_PER_PAGE
+from food.models import Ingredient, ShoppingCartIngredient
+
+URL = "/api/recipes/download_shopping_cart/"
+
+needs_font = pytest.mark.skipif(
+    not os.path.exists(settings.SHOPPING_LIST_FONT),
+    reason="нет файла шрифта для PDF",
+)
+
+
+def rows(count):
+    return [(f"ингредиент {number}", "г", float(number))
+            for number in range(count)]
+
+
+def page_texts(pdf):
+    return [page.extract_text() for page in PdfReader(BytesIO(pdf)).pages]
+
+
+@needs_font
+def test_pdf_pages_are_text():
+    count = LINES_PER_PAGE * 3
+
+    pages = page_texts(b"".join(render_pdf(rows(count))))
+
+    # Заголовок списка - ещё две строки, они переносят хвост
+    # на четвёртую страницу.
+    assert len(pages) == 4
+    assert "ингредиент 0: 0.0 г" in pages[0]
+    assert f"ингредиент {count - 1}: {count - 1}.0 г" in pages[-1]
+
+
+@needs_font
+def test_pdf_keeps_text_outside_cp1251():
+    pdf = b"".join(render_pdf([("crème brûlée (½ порции) ✓", "г", 5.0)]))
+
+    assert "crème brûlée (½ порции) ✓: 5.0 г" in page_texts(pdf)[0]
+
+
+@needs_font
+def test_pdf_embeds_only_used_glyphs():
+    pdf = b"".join(render_pdf(rows(3)))
+
+    assert len(pdf) < os.path.getsize(settings.SHOPPING_LIST_FONT) / 10
+
+
+def test_digest_counts_rows_without_keeping_them():
+    digest = export_digest(iter(rows(5)), "pdf")
+
+    assert digest.count == 5
+    assert digest.key == export_digest(rows(5), "pdf").key
+    assert digest.key != export_digest(rows(5), "txt").key
+    assert digest.key != export_digest(rows(4), "pdf").key
+
+
+@needs_font
+@pytest.mark.django_db
+def test_download_pdf_uses_etag(client, author):
+    Ingredient.objects.bulk_create(
+        Ingredient(name=name, measurement_unit=unit)
+        for name, unit, _ in rows(3)
+    )
+    ShoppingCartIngredient.objects.bulk_create(
+        ShoppingCartIngredient(user=author, ingredient=ingredient, amount=2)
+        for ingredient in Ingredient.objects.all()
+    )
+    client.force_authenticate(author)
+
+    response = client.get(URL, {"file_format": "pdf"})
+
+    assert response.status_code == 200
+    assert response["Content-Type"] == "application/pdf"
+    pdf = b"".join(response.streaming_content)
+    assert "ингредиент 2: 2.0 г" in page_texts(pdf)[0]
+    response = client.get(
+        URL,
+        {"file_format": "pdf"},
+        HTTP_IF_NONE_MATCH=response["ETag"],
+    )
+    assert response.status_code == 304
+
+
+@pytest.mark.django_db
+def test_large_cart_goes_to_background(client, author, monkeypatch):
+    monkeypatch.setattr(views, "EXPORT_BACKGROUND_THRESHOLD", 1)
+    Ingredient.objects.bulk_create(
+        Ingredient(name=name, measurement_unit=unit)
+        for name, unit, _ in rows(2)
+    )
+    ShoppingCartIngredient.objects.bulk_create(
+        ShoppingCartIngredient(user=author, ingredient=ingredient, amount=1)
+        for ingredient in Ingredient.objects.all()
+    )
+    client.force_authenticate(author)
+
+    assert client.get(URL, {"file_format": "pdf"}).status_code == 202
@@ -0,0 +1,47 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from food.management.commands.generate_fake_data import (MAX_QUERY_PARAMS,
+                                                         Command)
+from food.models import Recipe, Tag
+
+pytestmark = pytest.mark.django_db
+
+
+def test_recipes_get_distinct_dates_and_stored_images():
+    call_command(
+        "generate_fake_data",
+        users=10,
+        recipes=300,
+        ingredients=20,
+        tags=3,
+        stdout=StringIO(),
+    )
+
+    dates = list(
+        Recipe.objects.order_by("id").values_list("pub_date", flat=True)
+    )
+    assert all(older < newer for older, newer in zip(dates, dates[1:]))
+    storage = Recipe._meta.get_field("image").storage
+    for name in Recipe.objects.values_list("image", flat=True).distinct():
+        assert storage.exists(name)
+
+
+def test_insert_without_known_param_limit_uses_fixed_cap(monkeypatch):
+    monkeypatch.setattr(connection.features, "max_query_params", None)
+    fields = ("id", "name", "color", "slug")
+    per_insert = MAX_QUERY_PARAMS // len(fields)
+    rows = [
+        (number, f"тег {number}", "#49B64E", f"tag-{number}")
+        for number in range(1, per_insert + 2)
+    ]
+
+    with CaptureQueriesContext(connection) as queries:
+        Command().insert_rows(Tag, fields, rows)
+
+    assert len(queries) == 2
+    assert Tag.objects.count() == len(rows)
@@ -0,0 +1,104 @@
+import base64
+import os
+import struct
+import tracemalloc
+import zlib
+from io import BytesIO
+
+import pytest
+from PIL import Image
+from rest_framework.exceptions import ValidationError
+
+from api.fields import Base64ImageField
+from food.constants import BASE64_CHUNK_SIZE, IMAGE_MAX_PIXELS
+
+
+def data_uri(content, wrap=False):
+    encode = base64.encodebytes if wrap else base64.b64encode
+    return "data:image/png;base64," + encode(content).decode()
+
+
+def png(width, height):
+    buffer = BytesIO()
+    Image.new("RGB", (width, height), "red").save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def png_header(width, height):
+    """Заголовок PNG с размерами width x height и пустыми данными."""
+
+    def chunk(kind, data):
+        return (
+            struct.pack(">I", len(data))
+            + kind
+            + data
+            + struct.pack(">I", zlib.crc32(kind + data))
+        )
+
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+        + chunk(b"IDAT", b"")
+    )
+
+
+@pytest.fixture
+def no_pixel_decoding(monkeypatch):
+    """Пиксели картинки не распаковываются."""
+
+    def load(image):
+        raise AssertionError("пиксели распакованы")
+
+    monkeypatch.setattr(Image.Image, "load", load)
+
+
+def test_decodes_data_uri_with_line_breaks():
+    content = png(300, 200)
+    uri = data_uri(content, wrap=True)
+    assert "\n" in uri
+
+    file = Base64ImageField().decode(uri + "\r\n")
+
+    assert file.read() == content
+    assert file.size == len(content)
+
+
+def test_rejects_truncated_base64():
+    with pytest.raises(ValidationError):
+        Base64ImageField().decode(data_uri(png(10, 10))[:-1])
+
+
+@pytest.mark.filterwarnings("ignore::PIL.Image.DecompressionBombWarning")
+@pytest.mark.parametrize(
+    "size",
+    (
+        # Больше предела, но Pillow ещё открывает заголовок.
+        (6000, IMAGE_MAX_PIXELS // 6000 + 1),
+        # Pillow считает это бомбой распаковки.
+        (100_000, 100_000),
+    ),
+)
+def test_rejects_too_many_pixels(size, no_pixel_decoding):
+    with pytest.raises(ValidationError) as error:
+        Base64ImageField().decode(data_uri(png_header(*size)))
+
+    assert "пикселей" in str(error.value.detail)
+
+
+def test_decoding_memory_does_not_grow_with_image_size():
+    uri = data_uri(os.urandom(4 * 1024 * 1024), wrap=True)
+    field = Base64ImageField()
+    # Модули форматов Pillow загружаются при первом чтении картинки.
+    Image.init()
+
+    tracemalloc.start()
+    try:
+        file = field.decode(uri)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    file.close()
+
+    # Одна порция base64, её копия без переводов строк
+    # и декодированные байты; вся строка не копируется.
+    assert peak < 4 * BASE64_CHUNK_SIZE
@@ -0,0 +1,130 @@
+import os
+import time
+from datetime import timedelta
+from io import BytesIO
+
+import pytest
+from django.core.files.base import ContentFile
+from django.utils import timezone
+from PIL import Image
+
+from food import images
+from food.constants import IMAGE_RENDITIONS
+from food.images import (delete_unused_image, release_image, rendition_name,
+                         rendition_url)
+from food.models import Recipe
+from food.storage import content_storage
+from food.tasks import make_renditions_task
+from jobs.models import Job
+
+pytestmark = pytest.mark.django_db
+
+NAME = "images/recipe.png"
+
+
+@pytest.fixture
+def image(settings):
+    settings.IMAGE_RELEASE_DELAY = 60
+    content_storage.save(NAME, ContentFile(b"image"))
+    for rendition in IMAGE_RENDITIONS:
+        content_storage.save(
+            rendition_name(NAME, rendition),
+            ContentFile(b"rendition"),
+        )
+    return content_storage.path(NAME)
+
+
+def make_old(path):
+    past = time.time() - 3600
+    os.utime(path, (past, past))
+
+
+def test_release_only_schedules_deletion(image):
+    release_image(NAME)
+    release_image(NAME)
+
+    job = Job.objects.get(name="food.release_image")
+    assert job.payload == {"name": NAME}
+    assert job.run_after > timezone.now() + timedelta(seconds=30)
+    assert os.path.exists(image)
+
+
+def test_unused_image_is_deleted(image):
+    make_old(image)
+
+    assert delete_unused_image(NAME)
+
+    assert not os.path.exists(image)
+    for rendition in IMAGE_RENDITIONS:
+        assert not content_storage.exists(rendition_name(NAME, rendition))
+
+
+def test_image_used_by_recipe_is_kept(image, make_recipes):
+    make_old(image)
+    make_recipes(1)
+
+    assert not delete_unused_image(NAME)
+    assert os.path.exists(image)
+
+
+def test_image_saved_again_is_checked_later(image):
+    make_old(image)
+    # Тот же файл загружен для рецепта, который ещё не сохранён.
+    content_storage.save(NAME, ContentFile(b"image"))
+
+    assert not delete_unused_image(NAME)
+
+    assert os.path.exists(image)
+    assert Job.objects.filter(
+        name="food.release_image",
+        status=Job.PENDING,
+    ).exists()
+
+
+def test_concurrent_save_of_same_content(image, monkeypatch):
+    # Другой процесс записал файл после проверки exists().
+    monkeypatch.setattr(content_storage, "exists", lambda name: False)
+
+    assert content_storage.save(NAME, ContentFile(b"image")) == NAME
+
+    with open(image, "rb") as file:
+        assert file.read() == b"image"
+    assert not [
+        name for name in os.listdir(os.path.dirname(image))
+        if name.endswith(".tmp")
+    ]
+
+
+def test_missing_rendition_is_left_to_job(settings, monkeypatch):
+    settings.JOBS_EAGER = False
+    monkeypatch.setattr(
+        images,
+        "make_renditions",
+        lambda image: pytest.fail("копия создаётся в запросе"),
+    )
+    content_storage.save(NAME, ContentFile(b"image"))
+    field = Recipe._meta.get_field("image")
+    image = field.attr_class(None, field, NAME)
+
+    for rendition in (*IMAGE_RENDITIONS, *IMAGE_RENDITIONS):
+        assert rendition_url(image, rendition) == image.url
+
+    job = Job.objects.get(name="food.make_renditions")
+    assert job.payload == {"name": NAME}
+
+
+def test_rendition_job_touches_recipes(make_recipes):
+    buffer = BytesIO()
+    Image.new("RGB", (600, 400), "red").save(buffer, "PNG")
+    content_storage.save(NAME, ContentFile(buffer.getvalue()))
+    make_recipes(1)
+    before = Recipe.objects.get().updated_at
+
+    assert make_renditions_task(NAME) == {"created": True}
+
+    assert Recipe.objects.get().updated_at > before
+    field = Recipe._meta.get_field("image")
+    image = field.attr_class(None, field, NAME)
+    assert rendition_url(image, "card").endswith(
+        rendition_name(NAME, "card")
+    )
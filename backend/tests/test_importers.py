@@ -0,0 +1,132 @@
+import csv
+from datetime import datetime, timezone
+
+import pytest
+
+from food.exporters import RecipeExporter
+from food.importers import CopyLoader, RecipeImporter, TagImporter
+from food.models import Recipe, Tag
+
+pytestmark = pytest.mark.django_db
+
+PUB_DATE = datetime(2020, 5, 17, 12, 30, tzinfo=timezone.utc)
+
+
+def write_recipes(path, author, pub_dates=None):
+    header = ["id", "author", "name", "image", "text", "cooking_time"]
+    if pub_dates is not None:
+        header.append("pub_date")
+    with open(path, "w", encoding="utf-8", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(header)
+        for number in range(3):
+            row = [number + 1, author.pk, f"рецепт {number}",
+                   "images/recipe.png", "описание", 10]
+            if pub_dates is not None:
+                row.append(pub_dates[number])
+            writer.writerow(row)
+    return path
+
+
+def test_pub_date_is_taken_from_file(author, tmp_path):
+    path = write_recipes(
+        tmp_path / "recipe.csv",
+        author,
+        pub_dates=[PUB_DATE.isoformat(), "", "2021-01-01 10:00:00"],
+    )
+
+    stats = RecipeImporter(str(path)).run()
+
+    assert stats.created == 3
+    dates = dict(Recipe.objects.values_list("id", "pub_date"))
+    assert dates[1] == PUB_DATE
+    assert dates[2] > PUB_DATE
+    assert dates[3].year == 2021
+
+
+def test_rows_without_pub_date_get_distinct_dates(
+    author,
+    tmp_path,
+    monkeypatch,
+):
+    # Грубые часы: все строки вставляются в один момент.
+    monkeypatch.setattr("django.utils.timezone.now", lambda: PUB_DATE)
+    path = write_recipes(tmp_path / "recipe.csv", author)
+
+    RecipeImporter(str(path), batch_size=2).run()
+
+    dates = list(Recipe.objects.order_by("id").values_list(
+        "pub_date",
+        flat=True,
+    ))
+    assert dates == sorted(set(dates))
+
+
+def test_invalid_pub_date_is_counted_as_invalid(author, tmp_path):
+    path = write_recipes(
+        tmp_path / "recipe.csv",
+        author,
+        pub_dates=["вчера", "", ""],
+    )
+
+    stats = RecipeImporter(str(path)).run()
+
+    assert (stats.created, stats.invalid) == (2, 1)
+
+
+def test_export_keeps_pub_date(author, tmp_path):
+    RecipeImporter(
+        str(write_recipes(tmp_path / "recipe.csv", author, [PUB_DATE] * 3))
+    ).run()
+    exported = tmp_path / "export"
+    exported.mkdir()
+    RecipeExporter(str(exported)).run()
+    Recipe.objects.all().delete()
+
+    RecipeImporter(str(exported / "recipe.csv")).run()
+
+    assert set(Recipe.objects.values_list("pub_date", flat=True)) == {
+        PUB_DATE
+    }
+
+
+def test_copy_uses_file_pub_date_only_when_present():
+    importer = RecipeImporter(path="recipe.csv")
+    header = list(RecipeImporter.csv_columns)
+
+    with_date = importer.copy_expressions(header)["pub_date"]
+    without_date = importer.copy_expressions(header[:-1])["pub_date"]
+
+    assert "NULLIF(pub_date, '')::timestamptz" in with_date
+    assert "_row" in with_date
+    assert "pub_date" not in without_date
+    assert "_row" in without_date
+
+
+def test_rows_dropped_by_conflict_are_not_created(tmp_path):
+    Tag.objects.create(id=1, name="завтрак", color="#E26C2D", slug="b")
+    path = tmp_path / "tags.csv"
+    path.write_text(
+        "id,name,color,slug\n"
+        "2,завтрак,#E26C2D,breakfast\n"
+        "3,обед,#49B64E,lunch\n",
+        encoding="utf-8",
+    )
+
+    stats = TagImporter(str(path)).run()
+
+    assert (stats.created, stats.skipped) == (1, 1)
+    assert set(Tag.objects.values_list("id", flat=True)) == {1, 3}
+
+
+@pytest.mark.parametrize("header", [
+    'id,author,name,image,text,"cooking_time"" text); --"',
+    "id,author,name,image,text",
+    "id,author,name,image,text,cooking_time,cooking_time",
+])
+def test_copy_rejects_unexpected_header(tmp_path, header):
+    path = tmp_path / "recipe.csv"
+    path.write_text(header + "\n", encoding="utf-8")
+
+    with pytest.raises(ValueError):
+        CopyLoader(RecipeImporter(str(path))).run()
@@ -0,0 +1,95 @@
+import pytest
+
+from food import search
+from food.models import Ingredient
+from food.search import IngredientIndex, rebuild_ingredient_index
+
+pytestmark = pytest.mark.django_db
+
+NAMES = ("Молоко", "Мука", "Кокосовое молоко", "Сгущённое молоко", "Соль")
+
+
+@pytest.fixture
+def ingredients():
+    Ingredient.objects.bulk_create(
+        Ingredient(name=name, measurement_unit="г") for name in NAMES
+    )
+    rebuild_ingredient_index()
+
+
+@pytest.fixture
+def threads(monkeypatch):
+    """Потоки перестройки индекса не запускаются, а запоминаются."""
+
+    started = []
+
+    class Thread:
+        def __init__(self, target, **kwargs):
+            self.target = target
+
+        def start(self):
+            started.append(self.target)
+
+    monkeypatch.setattr(search.threading, "Thread", Thread)
+    monkeypatch.setattr(search, "_ingredient_index_building", False)
+    return started
+
+
+def names(client, value):
+    response = client.get("/api/ingredients/", {"name": value})
+    assert response.status_code == 200
+    return [ingredient["name"] for ingredient in response.json()]
+
+
+def test_index_puts_prefix_matches_first_and_stops_at_limit():
+    index = IngredientIndex(enumerate(NAMES, start=1))
+
+    assert index.search("мол", 10) == [1, 3, 4]
+    assert index.search("мол", 2) == [1, 3]
+    assert index.search("м", 10) == [1, 2, 3, 4]
+
+
+def test_search_orders_by_index(client, ingredients, threads, settings):
+    settings.INGREDIENT_SEARCH_LIMIT = 2
+
+    assert names(client, "мол") == ["Молоко", "Кокосовое молоко"]
+    assert not threads
+
+
+def test_stale_index_is_rebuilt_outside_request(client, ingredients, threads):
+    Ingredient.objects.create(name="Молоко топлёное", measurement_unit="мл")
+
+    assert names(client, "топлён") == ["Молоко топлёное"]
+    assert len(threads) == 1
+    assert names(client, "топлён") == ["Молоко топлёное"]
+    assert len(threads) == 1
+
+
+@pytest.mark.parametrize("limit", (2, 10))
+def test_all_search_paths_agree(client, ingredients, threads, settings,
+                                monkeypatch, limit):
+    settings.INGREDIENT_SEARCH_LIMIT = limit
+    # SQLite сравнивает кириллицу с учётом регистра: запрос и совпадения
+    # по началу - в одном регистре.
+    Ingredient.objects.bulk_create(
+        Ingredient(name=name, measurement_unit="г")
+        for name in ("Молоко овсяное", "Миндальное молоко", "олоконка")
+    )
+    rebuild_ingredient_index()
+    by_index = names(client, "олоко")
+    assert by_index == [
+        "олоконка",
+        "Кокосовое молоко",
+        "Миндальное молоко",
+        "Молоко",
+        "Молоко овсяное",
+        "Сгущённое молоко",
+    ][:limit]
+
+    settings.INGREDIENT_SEARCH = "trigram"
+    assert names(client, "олоко") == by_index
+
+    settings.INGREDIENT_SEARCH = "index"
+    # Индекс ещё строится: ищет запрос ORM.
+    monkeypatch.setattr(search, "get_ingredient_index", lambda: None)
+    assert names(client, "олоко") == by_index
@@ -0,0 +1,102 @@
+import threading
+from datetime import timedelta
+
+import pytest
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from jobs import queue
+from jobs.models import Job
+from jobs.queue import enqueue, requeue_stale, run_job, task
+
+pytestmark = pytest.mark.django_db
+
+beats = threading.Event()
+
+
+@task("tests.wait_for_heartbeat", max_attempts=1)
+def wait_for_heartbeat():
+    return {"beat": beats.wait(5)}
+
+
+@task("tests.noop")
+def noop():
+    return None
+
+
+def test_unfinished_key_is_unique():
+    Job.objects.create(name="tests.noop", key="k", status=Job.DONE)
+    Job.objects.create(name="tests.noop", key="k")
+    Job.objects.create(name="tests.noop")
+    Job.objects.create(name="tests.noop")
+
+    with pytest.raises(IntegrityError), transaction.atomic():
+        Job.objects.create(name="tests.noop", key="k", status=Job.RUNNING)
+
+
+def test_enqueue_returns_job_inserted_concurrently(monkeypatch):
+    other = Job.objects.create(name="tests.noop", key="k")
+    unfinished = queue.unfinished_job
+    calls = []
+
+    def unfinished_before_other_insert(key):
+        """Первая проверка не видит задачу другой транзакции."""
+
+        calls.append(key)
+        return None if len(calls) == 1 else unfinished(key)
+
+    monkeypatch.setattr(
+        queue,
+        "unfinished_job",
+        unfinished_before_other_insert,
+    )
+
+    assert enqueue("tests.noop", key="k") == other
+    assert len(calls) == 2
+    assert Job.objects.count() == 1
+
+
+def test_only_jobs_without_heartbeat_are_requeued(settings):
+    settings.JOBS_TIMEOUT = 600
+    long_ago = timezone.now() - timedelta(hours=1)
+    alive = Job.objects.create(
+        name="tests.noop",
+        status=Job.RUNNING,
+        attempts=1,
+        started_at=long_ago,
+    )
+    lost = Job.objects.create(
+        name="tests.noop",
+        status=Job.RUNNING,
+        attempts=1,
+        started_at=long_ago,
+        heartbeat_at=long_ago,
+    )
+
+    requeue_stale()
+
+    alive.refresh_from_db()
+    lost.refresh_from_db()
+    assert alive.status == Job.RUNNING
+    assert lost.status == Job.PENDING
+
+
+def test_running_job_renews_heartbeat(settings, monkeypatch):
+    settings.JOBS_HEARTBEAT = 0.01
+    touched = []
+
+    def touch_job(job_id):
+        # Поток не пишет в базу: тестовая SQLite в памяти
+        # заблокирована транзакцией теста.
+        touched.append(job_id)
+        beats.set()
+
+    monkeypatch.setattr(queue, "touch_job", touch_job)
+    beats.clear()
+    job = Job.objects.create(name="tests.wait_for_heartbeat")
+
+    assert run_job(job.pk) == Job.DONE
+
+    job.refresh_from_db()
+    assert job.result == {"beat": True}
+    assert set(touched) == {job.pk}
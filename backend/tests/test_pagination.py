@@ -0,0 +1,99 @@
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from food.models import Recipe
+from food.search import update_recipe_search
+
+pytestmark = pytest.mark.django_db
+
+
+# Если страниц больше, ссылки зациклились.
+MAX_PAGES = 50
+
+
+def walk(client, url, link):
+    """id рецептов всех страниц по ссылкам link."""
+
+    pages = []
+    while url:
+        assert len(pages) < MAX_PAGES
+        body = client.get(url).json()
+        pages.append([recipe["id"] for recipe in body["results"]])
+        url = body[link]
+    return pages
+
+
+def test_cursor_pages_do_not_repeat_tied_pub_date(client, make_recipes):
+    # Больше 1000: DRF CursorPagination различает одинаковые pub_date
+    # через OFFSET и не уходит дальше offset_cutoff=1000.
+    make_recipes(1250)
+    # Как после COPY-загрузки: у всех рецептов одно время публикации.
+    Recipe.objects.update(pub_date=timezone.now())
+    expected = list(
+        Recipe.objects.order_by("-pub_date", "-id").values_list(
+            "id",
+            flat=True,
+        )
+    )
+
+    pages = walk(client, "/api/recipes/?pagination=cursor&limit=100", "next")
+    ids = [pk for page in pages for pk in page]
+
+    assert len(ids) == len(set(ids))
+    assert ids == expected
+
+
+def test_cursor_previous_links_return_same_pages(client, make_recipes):
+    make_recipes(10)
+    Recipe.objects.update(pub_date=timezone.now())
+    url = "/api/recipes/?pagination=cursor&limit=3"
+    forward = walk(client, url, "next")
+    last = url
+    while True:
+        body = client.get(last).json()
+        if body["next"] is None:
+            break
+        last = body["next"]
+
+    backward = walk(client, last, "previous")
+
+    assert backward == forward[::-1]
+
+
+def test_invalid_cursor_is_not_found(client):
+    response = client.get("/api/recipes/?pagination=cursor&cursor=xyz")
+
+    assert response.status_code == 404
+
+
+def test_search_keeps_relevance_order_in_cursor_mode(client, author):
+    now = timezone.now()
+    best = Recipe.objects.create(
+        author=author,
+        name="борщ",
+        text="борщ со сметаной, настоящий борщ",
+        cooking_time=60,
+        image="images/recipe.png",
+    )
+    newer = Recipe.objects.create(
+        author=author,
+        name="суп",
+        text="почти как борщ",
+        cooking_time=30,
+        image="images/recipe.png",
+    )
+    Recipe.objects.filter(pk=best.pk).update(pub_date=now)
+    Recipe.objects.filter(pk=newer.pk).update(
+        pub_date=now + timedelta(minutes=1)
+    )
+    update_recipe_search(Recipe.objects.all())
+
+    body = client.get(
+        "/api/recipes/",
+        {"search": "борщ", "pagination": "cursor"},
+    ).json()
+
+    assert [recipe["id"] for recipe in body["results"]] == [best.pk, newer.pk]
+    assert "count" in body
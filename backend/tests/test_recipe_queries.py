@@ -0,0 +1,117 @@
+import pytest
+from django.core.files.base import ContentFile
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from api.fragments import recipe_fragments
+from food.constants import IMAGE_RENDITIONS
+from food.images import rendition_name
+from food.models import Ingredient, Recipe, RecipeIngredient, Tag
+from food.storage import content_storage
+
+pytestmark = pytest.mark.django_db
+
+RECIPES = 30
+# Анонимному пользователю не нужны подписки: на запрос меньше.
+LIST_QUERIES = {False: 5, True: 6}
+RETRIEVE_QUERIES = {False: 5, True: 6}
+
+
+@pytest.fixture
+def recipes(make_recipes):
+    """Рецепты с разным числом тегов и ингредиентов."""
+
+    Tag.objects.bulk_create(
+        Tag(name=f"тег {number}", color="#000000", slug=f"tag-{number}")
+        for number in range(3)
+    )
+    Ingredient.objects.bulk_create(
+        Ingredient(name=f"ингредиент {number}", measurement_unit="г")
+        for number in range(5)
+    )
+    tags = list(Tag.objects.all())
+    ingredients = list(Ingredient.objects.all())
+    make_recipes(RECIPES)
+    recipes = list(Recipe.objects.all())
+    for number, recipe in enumerate(recipes):
+        recipe.tags.set(tags[:number % 3 + 1])
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=10)
+            for ingredient in ingredients[:number % 5 + 1]
+        )
+    return recipes
+
+
+@pytest.fixture(params=(False, True), ids=("anonymous", "authenticated"))
+def authenticated(request, client, author):
+    if request.param:
+        client.force_authenticate(author)
+    return request.param
+
+
+@pytest.fixture(autouse=True)
+def renditions():
+    """Копии картинки готовы: задачи их создания не ставятся."""
+
+    for rendition in IMAGE_RENDITIONS:
+        content_storage.save(
+            rendition_name("images/recipe.png", rendition),
+            ContentFile(b"rendition"),
+        )
+
+
+@pytest.fixture(autouse=True)
+def empty_fragment_cache():
+    """Считаются запросы без кеша представлений."""
+
+    recipe_fragments.clear()
+    yield
+    recipe_fragments.clear()
+
+
+@pytest.mark.parametrize("limit", (2, RECIPES))
+def test_list_query_count_does_not_depend_on_page_size(
+    client, recipes, authenticated, limit, django_assert_num_queries,
+):
+    with django_assert_num_queries(LIST_QUERIES[authenticated]):
+        response = client.get("/api/recipes/", {"limit": limit})
+
+    assert response.status_code == 200
+    assert len(response.json()["results"]) == limit
+
+
+@pytest.mark.parametrize("number", (0, 2, 4))
+def test_retrieve_query_count_does_not_depend_on_relations(
+    client, recipes, authenticated, number, django_assert_num_queries,
+):
+    with django_assert_num_queries(RETRIEVE_QUERIES[authenticated]):
+        response = client.get(f"/api/recipes/{recipes[number].pk}/")
+
+    assert response.status_code == 200
+
+
+@pytest.mark.parametrize("pagination", ("page", "cursor"))
+def test_list_etag_is_built_from_served_page(
+    client, recipes, authenticated, pagination,
+):
+    url = "/api/recipes/"
+    params = {"limit": 2, "pagination": pagination}
+    with CaptureQueriesContext(connection) as queries:
+        etag = client.get(url, params)["ETag"]
+
+    assert not [
+        query["sql"] for query in queries if "MAX(" in query["sql"]
+    ]
+    if pagination == "cursor":
+        assert not [
+            query["sql"] for query in queries if "COUNT(" in query["sql"]
+        ]
+    response = client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+
+    Recipe.objects.filter(
+        pk=Recipe.objects.order_by("-pub_date", "-id")[0].pk
+    ).update(updated_at=timezone.now())
+
+    assert client.get(url, params, HTTP_IF_NONE_MATCH=etag).status_code == 200
@@ -0,0 +1,35 @@
+import pytest
+
+from food.models import Subscription
+
+pytestmark = pytest.mark.django_db
+
+URL = "/api/users/subscriptions/"
+
+
+def test_no_subscriptions_with_recipes_limit(client, author):
+    client.force_authenticate(author)
+
+    response = client.get(URL, {"recipes_limit": 2})
+
+    assert response.status_code == 200
+    assert response.json()["results"] == []
+
+
+def test_recipes_are_limited_per_author(client, author, make_recipes,
+                                        django_user_model):
+    reader = django_user_model.objects.create_user(
+        username="reader",
+        email="reader@example.com",
+        password="password",
+    )
+    Subscription.objects.create(user=reader, subscribed=author)
+    make_recipes(3)
+    client.force_authenticate(reader)
+
+    response = client.get(URL, {"recipes_limit": 2})
+
+    assert response.status_code == 200
+    (subscription,) = response.json()["results"]
+    assert len(subscription["recipes"]) == 2
+    assert subscription["recipes_count"] == 3
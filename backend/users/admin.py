@@ -1,7 +1,8 @@
 from django.contrib import admin
 
-from food.models import (Favourites, Ingredient, Recipe, RecipeIngredient,
-                         ShoppingList, Subscription, Tag)
+from food.models import (Favourites, ImportCheckpoint, Ingredient, Recipe,
+                         RecipeIngredient, ShoppingList, Subscription, Tag)
+from jobs.models import Job
 from users.models import CustomUser
 
 admin.site.empty_value_display = "Не задано"
@@ -99,3 +100,35 @@ class ShoppingListAdmin(admin.ModelAdmin):
         "user__username",
         "recipe__name",
     )
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = (
+        "pk",
+        "name",
+        "status",
+        "attempts",
+        "user",
+        "created_at",
+        "finished_at",
+    )
+    list_filter = (
+        "status",
+        "name",
+    )
+    search_fields = ("key",)
+
+
+@admin.register(ImportCheckpoint)
+class ImportCheckpointAdmin(admin.ModelAdmin):
+    list_display = (
+        "table",
+        "checksum",
+        "offset",
+        "rows",
+        "completed_at",
+        "updated_at",
+    )
+    list_filter = ("table",)
+    search_fields = ("checksum",)